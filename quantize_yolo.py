@@ -0,0 +1,187 @@
+"""
+INT8 post-training quantization of the trained food model.
+
+    python quantize_yolo.py runs/detect/train/weights/best.pt
+
+1. exports best.pt to ONNX (same static export detectors.py serves)
+2. calibrates on a random sample of yolo_food_dataset/images/val
+3. writes best_int8.onnx (QDQ, per-channel weights; the Detect head stays
+   float, quantizing its box/DFL outputs costs most of the accuracy)
+4. reports mAP50 / mAP50-95 of both models on the val split, plus latency
+   and memory per frame on this machine, against --frame-budget-ms
+
+Run the report on the station hardware (or pass --skip-map there and take
+the mAP numbers from a desktop run); x86 latency says little about a Pi.
+Deploy with DETECTOR_BACKEND=onnx DETECTOR_MODEL=.../best_int8.onnx.
+"""
+from ultralytics import YOLO
+import argparse
+import glob
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import cv2
+import onnx
+import psutil
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    CalibrationMethod,
+    QuantFormat,
+    QuantType,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "waste_watch_server"))
+from detectors import IMAGE_EXTS, OnnxDetector, _ExportedDetector, export  # noqa: E402
+
+
+DATA = "fooddataset.yaml"
+VAL_IMAGES = "yolo_food_dataset/images/val"
+
+
+def sample_images(folder, n, seed=0):
+    paths = sorted(p for p in glob.glob(os.path.join(folder, "*")) if p.lower().endswith(IMAGE_EXTS))
+    random.Random(seed).shuffle(paths)
+    return paths[:n]
+
+
+class ValCalibrationReader(CalibrationDataReader):
+    """Feeds val images through the exact letterbox the detector uses."""
+
+    def __init__(self, paths, input_name, imgsz):
+        self._letterbox = _ExportedDetector(imgsz, 0.0, 0.0)
+        self._input_name = input_name
+        self._paths = iter(paths)
+
+    def get_next(self):
+        for path in self._paths:
+            img = cv2.imread(path)
+            if img is not None:
+                return {self._input_name: self._letterbox.preprocess(img)[0]}
+        return None
+
+
+def head_nodes(model_path):
+    # ultralytics names nodes "/model.<layer>/...", the Detect head is the last layer
+    graph = onnx.load(model_path).graph
+    layers = [int(n.name.split("/")[1].split(".")[1]) for n in graph.node if n.name.startswith("/model.")]
+    head = f"/model.{max(layers)}/"
+    return [n.name for n in graph.node if n.name.startswith(head)]
+
+
+def quantize(fp32_path, int8_path, calib_paths, imgsz, method):
+    prep_path = fp32_path.replace(".onnx", "_prep.onnx")
+    quant_pre_process(fp32_path, prep_path)
+
+    input_name = onnx.load(prep_path).graph.input[0].name
+    excluded = head_nodes(prep_path)
+    print(f"🔢 Calibrating on {len(calib_paths)} val images, {len(excluded)} head nodes kept in float")
+
+    quantize_static(
+        prep_path,
+        int8_path,
+        ValCalibrationReader(calib_paths, input_name, imgsz),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=method,
+        nodes_to_exclude=excluded,
+    )
+    os.remove(prep_path)
+
+    # keep names/imgsz/stride from the export, detectors.py reads them
+    int8 = onnx.load(int8_path)
+    if not int8.metadata_props:
+        int8.metadata_props.extend(onnx.load(fp32_path).metadata_props)
+        onnx.save(int8, int8_path)
+    print(f"✅ Wrote {int8_path}")
+
+
+def evaluate_map(model_path, imgsz):
+    metrics = YOLO(model_path, task="detect").val(
+        data=DATA, imgsz=imgsz, batch=1, device="cpu", plots=False, verbose=False
+    )
+    return metrics.box.map50, metrics.box.map
+
+
+def _profile(model_path, image_paths, imgsz, threads):
+    # runs in a fresh process so each model's memory is measured on its own
+    proc = psutil.Process()
+    before = proc.memory_info().rss
+    detector = OnnxDetector(model_path, imgsz=imgsz, threads=threads)
+    images = [img for img in (cv2.imread(p) for p in image_paths) if img is not None]
+    for img in images[:3]:
+        detector.detect(img)
+    t0 = time.perf_counter()
+    for img in images:
+        detector.detect(img)
+    ms = (time.perf_counter() - t0) * 1000 / len(images)
+    return ms, (proc.memory_info().rss - before) / 2**20
+
+
+def profile(model_path, image_paths, imgsz, threads):
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_profile, (model_path, image_paths, imgsz, threads))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization for the food detector")
+    parser.add_argument("weights", help="trained .pt, e.g. runs/detect/train/weights/best.pt")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calib-images", type=int, default=300, help="val images used for calibration")
+    parser.add_argument("--calib-method", choices=["minmax", "percentile", "entropy"], default="minmax")
+    parser.add_argument("--bench-images", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=4, help="ORT threads for the latency run (Pi 4/5: 4)")
+    parser.add_argument("--frame-budget-ms", type=float, default=250.0)
+    parser.add_argument("--skip-map", action="store_true", help="only quantize + latency/memory")
+    args = parser.parse_args()
+
+    if not os.path.isdir(VAL_IMAGES):
+        print(f"❌ {VAL_IMAGES} not found, run from the repo root with the dataset in place")
+        return 1
+
+    fp32_path = export(args.weights, "onnx", args.imgsz)
+    int8_path = fp32_path.replace(".onnx", "_int8.onnx")
+    method = {
+        "minmax": CalibrationMethod.MinMax,
+        "percentile": CalibrationMethod.Percentile,
+        "entropy": CalibrationMethod.Entropy,
+    }[args.calib_method]
+    quantize(fp32_path, int8_path, sample_images(VAL_IMAGES, args.calib_images), args.imgsz, method)
+
+    # a different sample than calibration, so latency isn't measured on warm data
+    bench_paths = sample_images(VAL_IMAGES, args.bench_images, seed=1)
+    rows = []
+    for label, path in (("fp32", fp32_path), ("int8", int8_path)):
+        ms, mem_mb = profile(path, bench_paths, args.imgsz, args.threads)
+        map50 = map5095 = None
+        if not args.skip_map:
+            map50, map5095 = evaluate_map(path, args.imgsz)
+        rows.append((label, map50, map5095, ms, mem_mb, os.path.getsize(path) / 2**20))
+
+    print()
+    print(f"{'model':<6} {'mAP50':>7} {'mAP50-95':>9} {'ms/frame':>9} {'RSS MB':>7} {'file MB':>8}")
+    for label, map50, map5095, ms, mem_mb, size_mb in rows:
+        m50 = f"{map50:.4f}" if map50 is not None else "-"
+        m95 = f"{map5095:.4f}" if map5095 is not None else "-"
+        print(f"{label:<6} {m50:>7} {m95:>9} {ms:>9.1f} {mem_mb:>7.1f} {size_mb:>8.1f}")
+
+    (_, f50, f95, f_ms, f_mem, f_size), (_, q50, q95, q_ms, q_mem, q_size) = rows
+    print()
+    if not args.skip_map:
+        print(f"mAP50 {q50 - f50:+.4f}, mAP50-95 {q95 - f95:+.4f} (int8 - fp32)")
+    print(f"latency x{f_ms / q_ms:.2f}, RSS {q_mem - f_mem:+.1f} MB, file x{f_size / q_size:.2f} smaller")
+    if q_ms <= args.frame_budget_ms:
+        print(f"✅ int8 fits the {args.frame_budget_ms:.0f} ms frame budget")
+    else:
+        print(f"⚠️  int8 is over the {args.frame_budget_ms:.0f} ms frame budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -122,7 +122,12 @@ function EditMenu() {
             }
             const updated = await res.json();
             console.log("Updated menu:", updated);
-            alert("Menu updated!");
+            if (updated.conflicts?.length) {
+                // the rest was saved, these rows were changed by someone else meanwhile
+                alert(`Menu updated, except: ${updated.conflicts.join(", ")} (changed by someone else)`);
+            } else {
+                alert("Menu updated!");
+            }
 
             // Remember this as the last used menu
             const updatedId = updated.id || updated._id || id;
@@ -5,22 +5,29 @@ import Navbar from "../components/navbar";
 import Footer from "../components/Footer";
 
 const API_BASE = "/api"; // or "http://localhost:8000/api"
+const PAGE_SIZE = 50;
 
 function MenusList() {
     const [menus, setMenus] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState("");
+    // "after" value for the next page, null when everything is loaded
+    const [nextAfter, setNextAfter] = useState(null);
 
-    const loadMenus = async () => {
+    const loadMenus = async (after = null) => {
         try {
             setLoading(true);
-            const res = await fetch(`${API_BASE}/menus`);
+            const params = new URLSearchParams({ view: "index", limit: PAGE_SIZE });
+            if (after !== null) params.append("after", after);
+
+            const res = await fetch(`${API_BASE}/menus?${params.toString()}`);
             if (!res.ok) {
                 const text = await res.text();
                 throw new Error(text || "Failed to fetch menus");
             }
             const data = await res.json();
-            setMenus(data);
+            setMenus((prev) => (after === null ? data : [...prev, ...data]));
+            setNextAfter(res.headers.get("X-Next-After"));
         } catch (err) {
             console.error(err);
             setError(err.message);
@@ -63,14 +70,14 @@ function MenusList() {
                     </Link>
                 </div>
 
-                {loading && <p>Loading menus...</p>}
+                {loading && menus.length === 0 && <p>Loading menus...</p>}
                 {error && <p className="text-danger">{error}</p>}
 
                 {!loading && !error && menus.length === 0 && (
                     <p>No menus yet. Create one!</p>
                 )}
 
-                {!loading && menus.length > 0 && (
+                {menus.length > 0 && (
                     <table className="table table-striped">
                         <thead>
                             <tr>
@@ -85,7 +92,7 @@ function MenusList() {
                                 return (
                                     <tr key={id}>
                                         <td>{menu.name}</td>
-                                        <td>{menu.items?.length ?? 0}</td>
+                                        <td>{menu.item_count ?? menu.items?.length ?? 0}</td>
                                         <td>
                                             <Link
                                                 className="btn btn-sm btn-primary me-2"
@@ -112,6 +119,16 @@ function MenusList() {
                         </tbody>
                     </table>
                 )}
+
+                {nextAfter && (
+                    <button
+                        className="btn btn-outline-secondary"
+                        disabled={loading}
+                        onClick={() => loadMenus(nextAfter)}
+                    >
+                        {loading ? "Loading..." : "Load more"}
+                    </button>
+                )}
             </div>
             <Footer />
         </>
@@ -23,10 +23,32 @@ ChartJS.register(
 );
 
 const API_BASE = "/api";
+const MENU_PAGE_SIZE = 50;
+// dropdown entry that loads the next page of menus
+const MORE_MENUS = "__more__";
+
+// one page of the menu index, plus the "after" value of the next one (or null)
+const fetchMenuPage = async (after = null) => {
+    const params = new URLSearchParams({ view: "index", limit: MENU_PAGE_SIZE });
+    if (after !== null) params.append("after", after);
+
+    const res = await fetch(`${API_BASE}/menus?${params.toString()}`);
+    if (!res.ok) {
+        const text = await res.text();
+        throw new Error(text || "Failed to fetch menus");
+    }
+
+    const data = await res.json();
+    return {
+        menus: data.map((m) => ({ ...m, id: String(m.id ?? m._id) })),
+        nextAfter: res.headers.get("X-Next-After"),
+    };
+};
 
 function Reports() {
     const [menus, setMenus] = useState([]);
     const [selectedMenuId, setSelectedMenuId] = useState("");
+    const [menusNextAfter, setMenusNextAfter] = useState(null);
     const [scope, setScope] = useState("menu"); // "menu", "day", "week", "month"
 
     const [summary, setSummary] = useState(null);
@@ -42,19 +64,10 @@ function Reports() {
                 setLoading(true);
                 setError("");
 
-                const res = await fetch(`${API_BASE}/menus`);
-                if (!res.ok) {
-                    const text = await res.text();
-                    throw new Error(text || "Failed to fetch menus");
-                }
-
-                const data = await res.json();
-                const normalized = data.map((m) => ({
-                    ...m,
-                    id: String(m.id ?? m._id),
-                }));
-
+                // first page only, the dropdown loads more on demand
+                const { menus: normalized, nextAfter } = await fetchMenuPage();
                 setMenus(normalized);
+                setMenusNextAfter(nextAfter);
 
                 // default to first menu, but allow "All menus"
                 if (normalized.length > 0) {
@@ -145,6 +158,18 @@ function Reports() {
 
     const handleMenuChange = async (e) => {
         const newId = e.target.value;
+        if (newId === MORE_MENUS) {
+            // keep the current selection, just append the next page
+            try {
+                const page = await fetchMenuPage(menusNextAfter);
+                setMenus((prev) => [...prev, ...page.menus]);
+                setMenusNextAfter(page.nextAfter);
+            } catch (err) {
+                console.error(err);
+                setError(err.message || "Failed to fetch menus");
+            }
+            return;
+        }
         setSelectedMenuId(newId);
         await fetchSummary(newId || "", scope);
     };
@@ -387,6 +412,11 @@ function Reports() {
                                                     {m.name}
                                                 </option>
                                             ))}
+                                            {menusNextAfter && (
+                                                <option value={MORE_MENUS}>
+                                                    More menus...
+                                                </option>
+                                            )}
                                         </>
                                     )}
                                 </select>
@@ -0,0 +1,99 @@
+# bench_serialization.py
+"""
+Serialization time of large /api/menus and /listing payloads: FastAPI's
+default path (jsonable_encoder + JSONResponse, plus the old ObjectId -> str
+loop for listings) vs MongoJSONResponse (orjson).
+
+    python bench_serialization.py [menus] [items_per_menu]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from responses import MongoJSONResponse  # type: ignore
+
+FOODS = [
+    "mashed-potatoes-prepared-with-full-fat-milk-with-butter",
+    "chips-french-fries",
+    "mixed-salad-chopped-without-sauce",
+    "hamburger",
+    "pie-plum-baked-with-cake-dough",
+    "quiche-with-cheese-baked-with-puff-pastry",
+]
+
+
+def make_payloads(menus: int, items: int):
+    now = datetime.utcnow()
+    menu_list = []
+    rows = []
+    for n in range(1, menus + 1):
+        menu_items = []
+        for i in range(items):
+            name = FOODS[(n + i) % len(FOODS)]
+            menu_items.append({"name": name, "quantity": 20, "taken": 7, "wasted": 2, "rev": 3})
+            rows.append({
+                "_id": ObjectId(),
+                "item": name,
+                "qty": 20,
+                "meal_period": 1 + n % 3,
+                "day": 1 + n % 7,
+                "taken": 7,
+                "wasted": 2,
+                "menu_num": n,
+                "menu_name": f"Menu {n}",
+                "created_at": now - timedelta(hours=n),
+                "rev": 3,
+            })
+        menu_list.append({"id": n, "name": f"Menu {n}", "meal_period": 1 + n % 3, "items": menu_items})
+    return menu_list, rows
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def default_listing(rows):
+    items = [dict(r) for r in rows]
+    for item in items:
+        item["_id"] = str(item["_id"])
+    return JSONResponse(jsonable_encoder(items)).body
+
+
+def main():
+    menus = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    menu_list, rows = make_payloads(menus, items)
+
+    cases = [
+        (
+            f"/api/menus ({menus} menus x {items} items)",
+            lambda: JSONResponse(jsonable_encoder(menu_list)).body,
+            lambda: MongoJSONResponse(menu_list).body,
+        ),
+        (
+            f"/listing ({len(rows)} rows)",
+            lambda: default_listing(rows),
+            lambda: MongoJSONResponse(rows).body,
+        ),
+    ]
+
+    for name, default, fast in cases:
+        t_default = best_of(default)
+        t_fast = best_of(fast)
+        print(
+            f"{name}: default {t_default * 1000:.1f} ms, "
+            f"orjson {t_fast * 1000:.1f} ms ({t_default / t_fast:.1f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
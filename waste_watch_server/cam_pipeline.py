@@ -0,0 +1,164 @@
+# cam_pipeline.py
+"""
+Threaded capture -> inference -> display pipeline for start_cam.py.
+
+Each stage runs in its own thread and hands frames on through a bounded
+queue. When the next stage falls behind, the oldest waiting frame is
+dropped (the newest frame is the one worth looking at), so the camera never
+waits on YOLO and latency stays within CAM_QUEUE_SIZE frames.
+
+.env settings:
+    CAM_QUEUE_SIZE    frames held between two stages (default 2)
+    CAM_FPS_REPORT_S  seconds between per-stage FPS lines, 0 = off (default 10)
+"""
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+CAM_QUEUE_SIZE = int(os.getenv("CAM_QUEUE_SIZE", "2"))
+CAM_FPS_REPORT_S = float(os.getenv("CAM_FPS_REPORT_S", "10"))
+
+
+class StageStats:
+    """Frames handled / dropped by one stage, FPS since the last report."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._window_frames = 0
+        self._window_start = time.monotonic()
+
+    def tick(self):
+        with self._lock:
+            self.frames += 1
+            self._window_frames += 1
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def fps(self) -> float:
+        # resets the window, meant to be called by the reporter only
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            rate = self._window_frames / elapsed if elapsed > 0 else 0.0
+            self._window_frames = 0
+            self._window_start = now
+            return rate
+
+
+def put_latest(q: queue.Queue, item: Any, stats: Optional[StageStats] = None):
+    """Put without blocking; if the queue is full the oldest entry goes."""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+                if stats is not None:
+                    stats.drop()
+            except queue.Empty:
+                pass
+
+
+def get_or_none(q: queue.Queue, timeout: float = 0.1):
+    try:
+        return q.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+class Pipeline:
+    """
+    source() -> frame runs in the capture thread, process(frame) -> item in
+    the inference thread (None = nothing to show). The caller drains
+    `display_queue` on the main thread, since OpenCV windows must live there.
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], Any],
+        process: Callable[[Any], Any],
+        queue_size: int = CAM_QUEUE_SIZE,
+        report_every_s: float = CAM_FPS_REPORT_S,
+        report_extra: Optional[Callable[[], str]] = None,
+    ):
+        self.source = source
+        self.process = process
+        self.report_every_s = report_every_s
+        # appended to each FPS line, e.g. the motion gate's skip rate
+        self.report_extra = report_extra
+        self.frame_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.display_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.capture_stats = StageStats("capture")
+        self.inference_stats = StageStats("inference")
+        self.display_stats = StageStats("display")
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def _capture(self):
+        while not self.stopped:
+            frame = self.source()
+            self.capture_stats.tick()
+            # a drop here means inference is the bottleneck
+            put_latest(self.frame_queue, frame, self.inference_stats)
+
+    def _infer(self):
+        while not self.stopped:
+            frame = get_or_none(self.frame_queue)
+            if frame is None:
+                continue
+            item = self.process(frame)
+            self.inference_stats.tick()
+            if item is not None:
+                put_latest(self.display_queue, item, self.display_stats)
+
+    def _report(self):
+        stages = (self.capture_stats, self.inference_stats, self.display_stats)
+        while not self.stop_event.wait(self.report_every_s):
+            parts = [f"{s.name} {s.fps():.1f} fps ({s.dropped} dropped)" for s in stages]
+            if self.report_extra is not None:
+                parts.append(self.report_extra())
+            print("📊 " + " | ".join(parts))
+
+    def _guard(self, target: Callable[[], None]) -> Callable[[], None]:
+        # a crashed worker stops the whole pipeline instead of hanging it
+        def run():
+            try:
+                target()
+            except Exception as e:
+                print(f"❌ {target.__name__.strip('_')} stage failed: {e}")
+                self.stop_event.set()
+        return run
+
+    def start(self):
+        workers = [self._capture, self._infer]
+        if self.report_every_s > 0:
+            workers.append(self._report)
+        for target in workers:
+            t = threading.Thread(target=self._guard(target), name=target.__name__.strip("_"), daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def next_display(self, timeout: float = 0.05):
+        item = get_or_none(self.display_queue, timeout)
+        if item is not None:
+            self.display_stats.tick()
+        return item
+
+    def stop(self, timeout: float = 5.0):
+        self.stop_event.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
@@ -0,0 +1,252 @@
+# change_feed.py
+"""
+Live row-level changes for dashboards (WebSocket /ws/changes and SSE
+/api/changes/stream).
+
+Every delta is the current state of one listing row:
+    {"op": "upsert" | "delete", "id", "menu_num", "item", "taken", "wasted"}
+
+Source: a Mongo change stream on the listing collection when the server
+supports it (replica set / Atlas), so writes from any process show up.
+Otherwise the routes in main.py publish in-process after each write.
+
+Backpressure: each subscriber holds at most CHANGE_FEED_MAX_PENDING rows.
+A slow client gets the latest state per row (older deltas for the same row
+are replaced, not queued); if it falls further behind than that its backlog
+is dropped and it gets one {"type": "resync"} telling it to re-fetch.
+
+.env settings:
+    CHANGE_FEED_SOURCE       auto | local (default auto; local skips the
+                             change stream even when Mongo has one)
+    CHANGE_FEED_MAX_PENDING  rows buffered per subscriber (default 500)
+    CHANGE_FEED_HEARTBEAT_S  idle seconds before a keep-alive (default 15)
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database import collection  # type: ignore
+
+
+CHANGE_FEED_SOURCE = os.getenv("CHANGE_FEED_SOURCE", "auto")
+CHANGE_FEED_MAX_PENDING = int(os.getenv("CHANGE_FEED_MAX_PENDING", "500"))
+CHANGE_FEED_HEARTBEAT_S = float(os.getenv("CHANGE_FEED_HEARTBEAT_S", "15"))
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+RESYNC = {"type": "resync"}
+
+
+def row_delta(doc: dict, op: str = "upsert") -> dict:
+    return {
+        "op": op,
+        "id": str(doc["_id"]),
+        "menu_num": doc.get("menu_num"),
+        "item": doc.get("item"),
+        "taken": int(doc.get("taken") or 0),
+        "wasted": int(doc.get("wasted") or 0),
+    }
+
+
+class Subscription:
+    def __init__(self, menus: Optional[Iterable[int]] = None, max_pending: int = CHANGE_FEED_MAX_PENDING):
+        self.menus: Optional[set[int]] = None
+        self.set_menus(menus)
+        self.max_pending = max_pending
+        # row id -> latest delta, oldest first
+        self._pending: OrderedDict[str, dict] = OrderedDict()
+        self._resync = False
+        self._closed = False
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+        self.resyncs = 0
+
+    def set_menus(self, menus: Optional[Iterable[int]]):
+        """None = every menu."""
+        self.menus = None if menus is None else {int(m) for m in menus}
+
+    def wants(self, delta: dict) -> bool:
+        # rows without a menu (plain /listing scans) only go to "all"
+        return self.menus is None or delta.get("menu_num") in self.menus
+
+    def offer(self, delta: dict):
+        if self._closed or not self.wants(delta):
+            return
+        key = delta["id"]
+        if key in self._pending:
+            self._pending.move_to_end(key)
+            self.coalesced += 1
+        elif len(self._pending) >= self.max_pending:
+            self.resync()
+            return
+        if not self._resync:
+            self._pending[key] = delta
+        self._ready.set()
+
+    def resync(self):
+        self._pending.clear()
+        if not self._resync:
+            self.resyncs += 1
+        self._resync = True
+        self._ready.set()
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[list[dict]]:
+        """
+        Everything pending, [RESYNC], [] after `timeout` with nothing to send
+        (time for a heartbeat), or None once closed.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            return []
+        self._ready.clear()
+        if self._closed:
+            return None
+        if self._resync:
+            self._resync = False
+            return [RESYNC]
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+class ChangeFeed:
+    def __init__(self, source: str = CHANGE_FEED_SOURCE):
+        self.source = source
+        # "change_stream" only while a stream is actually open
+        self.mode = "local"
+        self._subs: set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        # totals of subscribers that already left
+        self._coalesced = 0
+        self._resyncs = 0
+
+    # ---- subscribers ----
+
+    def subscribe(self, menus: Optional[Iterable[int]] = None) -> Subscription:
+        sub = Subscription(menus)
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        if sub in self._subs:
+            self._subs.discard(sub)
+            self._coalesced += sub.coalesced
+            self._resyncs += sub.resyncs
+
+    def _fan_out(self, deltas: Iterable[dict]):
+        for delta in deltas:
+            self.published += 1
+            for sub in self._subs:
+                sub.offer(delta)
+
+    # ---- in-process source, called by the write routes ----
+
+    def publish(self, upserted: Iterable[dict] = (), deleted: Iterable[dict] = ()):
+        if self.mode == "change_stream" or not self._subs:
+            return
+        upserted = [row_delta(d) for d in upserted]
+        seen = {d["id"] for d in upserted}
+        self._fan_out(upserted)
+        self._fan_out(row_delta(d, op="delete") for d in deleted if str(d["_id"]) not in seen)
+
+    def publish_changes(self, added: list[dict], removed: list[dict]):
+        """Same (added, removed) shape as rollups.apply_changes."""
+        self.publish(upserted=added, deleted=removed)
+
+    def menu_deleted(self, menu_num: int):
+        # the rows are gone without being read, subscribers re-fetch instead
+        if self.mode == "change_stream":
+            return
+        for sub in self._subs:
+            if sub.wants({"menu_num": int(menu_num)}):
+                sub.resync()
+
+    # ---- change stream source ----
+
+    async def _watch(self):
+        resume_token = None
+        backoff = 1.0
+        while True:
+            try:
+                stream = await collection.watch(
+                    [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}],
+                    full_document="updateLookup",
+                    resume_after=resume_token,
+                )
+                async with stream:
+                    if self.mode != "change_stream":
+                        print("🔔 Change feed: following Mongo change stream")
+                    self.mode = "change_stream"
+                    backoff = 1.0
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        self._on_change(change)
+            except asyncio.CancelledError:
+                raise
+            except (OperationFailure, NotImplementedError) as e:
+                if getattr(e, "code", None) == CHANGE_STREAMS_UNSUPPORTED or isinstance(e, NotImplementedError):
+                    print(f"⚠️  Change streams unavailable, publishing in-process: {e}")
+                    self.mode = "local"
+                    return
+                self._stream_lost(e)
+            except PyMongoError as e:
+                self._stream_lost(e)
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _stream_lost(self, e: Exception):
+        print(f"⚠️  Change stream interrupted, reconnecting: {e}")
+        # writes made while reconnecting may be missed or doubled, clients re-fetch
+        self.mode = "local"
+        for sub in self._subs:
+            sub.resync()
+
+    def _on_change(self, change: dict):
+        op = change["operationType"]
+        if op == "delete":
+            # no pre-image, so we can't tell which menu the row was in
+            for sub in self._subs:
+                sub.resync()
+            return
+        doc = change.get("fullDocument")
+        if doc is not None:
+            self._fan_out([row_delta(doc)])
+
+    # ---- lifecycle ----
+
+    def start(self):
+        if self.source != "local" and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        for sub in list(self._subs):
+            self.unsubscribe(sub)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self.mode = "local"
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "subscribers": len(self._subs),
+            "published": self.published,
+            "coalesced": self._coalesced + sum(s.coalesced for s in self._subs),
+            "resyncs": self._resyncs + sum(s.resyncs for s in self._subs),
+        }
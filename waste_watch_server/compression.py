@@ -0,0 +1,190 @@
+# compression.py
+"""
+Negotiated response compression (zstd / br / gzip) as ASGI middleware.
+
+Env:
+  COMPRESSION_MIN_SIZE        bytes below which responses go out as is (default 1024)
+  COMPRESSION_GZIP_LEVEL      default 6
+  COMPRESSION_BROTLI_QUALITY  default 4 (11 is far too slow per request)
+  COMPRESSION_ZSTD_LEVEL      default 3
+
+brotli and zstd are optional, without them only gzip is offered. Streamed
+responses (NDJSON listing) are compressed chunk by chunk, flushing after
+each one; server-sent events are left alone so they aren't held back.
+"""
+import gzip
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+try:
+    import zstd  # type: ignore
+except ImportError:
+    zstd = None
+
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# server preference when the client rates several codings the same
+WHOLE_BODY_CODINGS = [c for c, ok in (("zstd", zstd), ("br", brotli), ("gzip", True)) if ok]
+# the zstd binding has no streaming API
+STREAM_CODINGS = [c for c in WHOLE_BODY_CODINGS if c != "zstd"]
+
+NEVER_COMPRESS = ("text/event-stream", "image/", "video/", "application/zip")
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """{"gzip": 1.0, "br": 0.5, ...} from an Accept-Encoding header."""
+    accepted: dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(accepted: dict[str, float], offered: list[str]):
+    """Best coding we offer that the client accepts, or None."""
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "zstd":
+        return zstd.compress(body, COMPRESSION_ZSTD_LEVEL)
+    if coding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class _GzipStream:
+    def __init__(self):
+        self._c = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._c.compress(chunk) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._c.process(chunk) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+def _stream_for(coding: str):
+    return _BrotliStream() if coding == "br" else _GzipStream()
+
+
+def _skip(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304):
+        return True
+    if "content-encoding" in headers:
+        return True
+    return headers.get("content-type", "").startswith(NEVER_COMPRESS)
+
+
+def _mark_encoded(headers: MutableHeaders, coding: str):
+    headers["Content-Encoding"] = coding
+    # the encoded bytes are a different representation, a strong ETag would
+    # claim byte equality; If-None-Match still matches (weak comparison)
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # even without a usable coding, responses still get Vary so shared
+        # caches keep the plain and encoded variants apart
+        accepted = parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+
+        start_message = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+
+            if message["type"] == "http.response.start":
+                # held back until the first body chunk tells us the size
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is None:
+                # later chunks of a streamed response
+                if stream is not None:
+                    body = stream.compress(body) if more_body else stream.compress(body) + stream.finish()
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(scope=start)
+            if _skip(start["status"], headers):
+                await send(start)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body:
+                coding = negotiate(accepted, WHOLE_BODY_CODINGS) if len(body) >= self.minimum_size else None
+                if coding:
+                    body = compress(body, coding)
+                    _mark_encoded(headers, coding)
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            coding = negotiate(accepted, STREAM_CODINGS)
+            if coding:
+                stream = _stream_for(coding)
+                body = stream.compress(body)
+                _mark_encoded(headers, coding)
+                del headers["Content-Length"]
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,93 @@
+# counters.py
+"""
+Sequence allocator for menu numbers.
+
+One counter doc ({_id: "menu_num", seq: n}) bumped with $inc, so allocating
+a number is a single O(1) write and two concurrent creates can never get
+the same number. Writes that pick their own menu_num (PUT /api/menus/{n},
+POST /listing) raise the counter with $max so it never falls behind them.
+
+Seed it from the current max menu_num once (lifespan does this when the
+counter doesn't exist yet, and next_menu_num re-seeds if the doc goes
+missing; safe to re-run, it never goes backwards):
+
+    python counters.py seed
+"""
+import asyncio
+import sys
+
+from pymongo import ReturnDocument
+
+from database import client, collection, counters_collection  # type: ignore
+
+
+MENU_NUM = "menu_num"
+
+
+async def next_menu_num() -> int:
+    # no upsert: a missing counter would restart at 1 and hand out numbers
+    # that already exist, so it's re-seeded from the data first
+    while True:
+        doc = await counters_collection.find_one_and_update(
+            {"_id": MENU_NUM},
+            {"$inc": {"seq": 1}},
+            projection={"seq": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None:
+            return doc["seq"]
+        seq = await seed_menu_counter()
+        print(f"⚠️  menu_num counter was missing, re-seeded at {seq}")
+
+
+async def raise_menu_counter(menu_num: int):
+    """Keep the counter >= a menu_num written with an explicit number."""
+    doc = await counters_collection.find_one_and_update(
+        {"_id": MENU_NUM},
+        {"$max": {"seq": int(menu_num)}},
+        projection={"seq": 1},
+    )
+    if doc is None:
+        # seeding reads the max from the rows, which include this one
+        await seed_menu_counter()
+
+
+async def seed_menu_counter() -> int:
+    """Raise the counter to the highest menu_num already in the listing rows."""
+    max_doc = await collection.find_one(
+        {"menu_num": {"$exists": True}},
+        sort=[("menu_num", -1)],
+        projection={"menu_num": 1},
+    )
+    current_max = max_doc["menu_num"] if max_doc else 0
+
+    # $max: never moves the counter backwards, even if re-run later
+    doc = await counters_collection.find_one_and_update(
+        {"_id": MENU_NUM},
+        {"$max": {"seq": current_max}},
+        projection={"seq": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["seq"]
+
+
+async def ensure_menu_counter():
+    if await counters_collection.find_one({"_id": MENU_NUM}) is None:
+        seq = await seed_menu_counter()
+        print(f"🔢 Seeded menu_num counter at {seq}")
+
+
+async def _main(cmd: str) -> int:
+    if cmd != "seed":
+        print(f"Unknown command {cmd!r}, use 'seed'")
+        return 2
+    try:
+        print(f"🔢 menu_num counter at {await seed_menu_counter()}")
+        return 0
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "seed")))
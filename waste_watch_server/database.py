@@ -1,5 +1,5 @@
 # database.py
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 from dotenv import load_dotenv
 import os
 
@@ -9,7 +9,24 @@ MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME")  # for listings
 
-client = MongoClient(MONGO_URI)
+# Connection pool / timeouts, all overridable from .env
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+# One shared async client for the whole process. It doesn't connect until
+# main.lifespan calls aconnect() (or the first query runs), and lifespan
+# closes it on shutdown.
+client = AsyncMongoClient(
+    MONGO_URI,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+)
 
 db = client[DB_NAME]
 
@@ -18,3 +35,21 @@ collection = db[COLLECTION_NAME]
 
 # NEW: collection specifically for menus
 menus_collection = db["menus"]
+
+# Per-item, per-menu, per-day waste totals (see rollups.py)
+rollups_collection = db["waste_rollups"]
+
+# Cached Gemini summaries (see summary_cache.py)
+summary_cache_collection = db["summary_cache"]
+
+# Change counters per menu + global (see versions.py)
+versions_collection = db["data_versions"]
+
+# Stored day/week/month reports (see precompute.py)
+precomputed_collection = db["precomputed_summaries"]
+
+# Sequence counters, e.g. the next menu_num (see counters.py)
+counters_collection = db["counters"]
+
+# One-off setup markers, e.g. "rollups built" (see rollups.py)
+setup_collection = db["setup_state"]
@@ -0,0 +1,355 @@
+# detectors.py
+"""
+Detector backends for the camera station.
+
+    torch     ultralytics YOLO on the .pt weights (what we trained)
+    onnx      ONNX Runtime on an exported .onnx, no torch at runtime
+    openvino  OpenVINO on an exported IR (*_openvino_model/ folder)
+
+All of them take a BGR frame and return the same Detection tuples, so
+start_cam.py doesn't care which one it runs.
+onnxruntime is in requirements.txt, openvino is optional (pip install
+openvino) and only imported when that backend is picked.
+
+.env settings:
+    DETECTOR_BACKEND  torch | onnx | openvino (default torch)
+    DETECTOR_MODEL    weights / exported model path
+    DETECTOR_IMGSZ    input size the model was exported with (default 640)
+    DETECTOR_CONF     score floor before NMS (default 0.25, as ultralytics)
+    DETECTOR_IOU      NMS IoU threshold (default 0.7, as ultralytics)
+    DETECTOR_THREADS  CPU threads for onnx/openvino, 0 = runtime default
+
+CLI:
+    python detectors.py export best.pt --format onnx|openvino [--imgsz 640]
+    python detectors.py parity best.pt best.onnx --images <dir>
+    python detectors.py bench --images <dir> torch=best.pt onnx=best.onnx ...
+"""
+import argparse
+import ast
+import glob
+import os
+import sys
+import time
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "torch")
+DETECTOR_MODEL = os.getenv("DETECTOR_MODEL", "/home/adpifive/Documents/wastewatch/best.pt")
+DETECTOR_IMGSZ = int(os.getenv("DETECTOR_IMGSZ", "640"))
+DETECTOR_CONF = float(os.getenv("DETECTOR_CONF", "0.25"))
+DETECTOR_IOU = float(os.getenv("DETECTOR_IOU", "0.7"))
+DETECTOR_THREADS = int(os.getenv("DETECTOR_THREADS", "0"))
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class Detection(NamedTuple):
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    conf: float
+    class_id: int
+
+
+class Detector:
+    """detect(frame) -> list[Detection]; names maps class id -> name."""
+
+    backend = ""
+    names: dict[int, str] = {}
+
+    def detect(self, frame: np.ndarray) -> list[Detection]:
+        raise NotImplementedError
+
+
+class TorchDetector(Detector):
+    backend = "torch"
+
+    def __init__(self, path: str, conf: float = DETECTOR_CONF, iou: float = DETECTOR_IOU):
+        from ultralytics import YOLO
+
+        self.model = YOLO(path)
+        self.names = dict(self.model.names)
+        self.conf = conf
+        self.iou = iou
+
+    def detect(self, frame):
+        r = self.model(frame, conf=self.conf, iou=self.iou, verbose=False)[0]
+        return [
+            Detection(*map(float, xyxy), float(c), int(k))
+            for xyxy, c, k in zip(r.boxes.xyxy.tolist(), r.boxes.conf.tolist(), r.boxes.cls.tolist())
+        ]
+
+
+class _ExportedDetector(Detector):
+    """Letterbox pre-processing + YOLOv8 head decoding + NMS in numpy/OpenCV."""
+
+    def __init__(self, imgsz: int, conf: float, iou: float):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def preprocess(self, frame):
+        h, w = frame.shape[:2]
+        gain = min(self.imgsz / h, self.imgsz / w)
+        nh, nw = round(h * gain), round(w * gain)
+        pad_y, pad_x = (self.imgsz - nh) / 2, (self.imgsz - nw) / 2
+
+        img = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR) if (nh, nw) != (h, w) else frame
+        top, left = round(pad_y - 0.1), round(pad_x - 0.1)
+        img = cv2.copyMakeBorder(
+            img, top, self.imgsz - nh - top, left, self.imgsz - nw - left,
+            cv2.BORDER_CONSTANT, value=(114, 114, 114),
+        )
+        # BGR HWC uint8 -> RGB NCHW float
+        blob = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1), dtype=np.float32)[None] / 255.0
+        return blob, gain, (left, top)
+
+    def postprocess(self, out: np.ndarray, gain: float, pad, shape) -> list[Detection]:
+        # (1, 4 + classes, anchors) -> (anchors, 4 + classes)
+        pred = out[0].T
+        scores = pred[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), class_ids]
+        keep = confs >= self.conf
+        if not keep.any():
+            return []
+        pred, class_ids, confs = pred[keep], class_ids[keep], confs[keep]
+
+        cx, cy, bw, bh = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= gain
+        h, w = shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+
+        # per-class NMS in one call: shift each class into its own region
+        offset = class_ids[:, None] * 7680.0
+        shifted = boxes + offset
+        xywh = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+        idx = cv2.dnn.NMSBoxes(xywh.tolist(), confs.tolist(), self.conf, self.iou)
+        # NMSBoxes returns () when it keeps nothing (e.g. every score == conf)
+        idx = np.array(idx, dtype=int).reshape(-1)
+        if idx.size == 0:
+            return []
+        idx = idx[np.argsort(-confs[idx])]
+        return [
+            Detection(*map(float, boxes[i]), float(confs[i]), int(class_ids[i]))
+            for i in idx
+        ]
+
+    def detect(self, frame):
+        blob, gain, pad = self.preprocess(frame)
+        return self.postprocess(self._run(blob), gain, pad, frame.shape)
+
+
+def _names_from(raw) -> dict[int, str]:
+    # ultralytics stores names as the repr of a dict in the export metadata
+    if isinstance(raw, str):
+        raw = ast.literal_eval(raw)
+    return {int(k): str(v) for k, v in raw.items()}
+
+
+def _registry_names() -> dict[int, str]:
+    from food_classes import class_names  # type: ignore
+
+    return dict(enumerate(class_names()))
+
+
+class OnnxDetector(_ExportedDetector):
+    backend = "onnx"
+
+    def __init__(self, path: str, imgsz: int = DETECTOR_IMGSZ, conf: float = DETECTOR_CONF,
+                 iou: float = DETECTOR_IOU, threads: int = DETECTOR_THREADS):
+        import onnxruntime as ort
+
+        super().__init__(imgsz, conf, iou)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = _names_from(meta["names"]) if "names" in meta else _registry_names()
+        if "imgsz" in meta:
+            self.imgsz = int(ast.literal_eval(meta["imgsz"])[0])
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoDetector(_ExportedDetector):
+    backend = "openvino"
+
+    def __init__(self, path: str, imgsz: int = DETECTOR_IMGSZ, conf: float = DETECTOR_CONF,
+                 iou: float = DETECTOR_IOU, threads: int = DETECTOR_THREADS):
+        import openvino as ov
+        import yaml
+
+        super().__init__(imgsz, conf, iou)
+        # accept the export folder or the .xml inside it
+        xml = path if path.endswith(".xml") else (glob.glob(os.path.join(path, "*.xml")) or [path])[0]
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = core.compile_model(core.read_model(xml), "CPU", config)
+        self.output = self.compiled.output(0)
+
+        meta_path = os.path.join(os.path.dirname(xml), "metadata.yaml")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = yaml.safe_load(f) or {}
+        self.names = _names_from(meta["names"]) if "names" in meta else _registry_names()
+        if "imgsz" in meta:
+            self.imgsz = int(meta["imgsz"][0])
+
+    def _run(self, blob):
+        return self.compiled([blob])[self.output]
+
+
+BACKENDS = {
+    "torch": TorchDetector,
+    "onnx": OnnxDetector,
+    "openvino": OpenVinoDetector,
+}
+
+
+def get_detector(backend: Optional[str] = None, path: Optional[str] = None) -> Detector:
+    backend = backend or DETECTOR_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown DETECTOR_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[backend](path or DETECTOR_MODEL)
+
+
+def draw_detections(frame: np.ndarray, detections: list[Detection], names: dict[int, str]) -> np.ndarray:
+    out = frame.copy()
+    for d in detections:
+        p1, p2 = (int(d.x1), int(d.y1)), (int(d.x2), int(d.y2))
+        cv2.rectangle(out, p1, p2, (0, 200, 0), 2)
+        cv2.putText(out, f"{names.get(d.class_id, d.class_id)} {d.conf:.2f}", (p1[0], max(p1[1] - 6, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 200, 0), 1, cv2.LINE_AA)
+    return out
+
+
+# ---------- export / parity / bench ----------
+
+def export(weights: str, fmt: str, imgsz: int = DETECTOR_IMGSZ) -> str:
+    from ultralytics import YOLO
+
+    # static shape + simplified graph run best on CPU runtimes
+    kwargs = {"simplify": True, "opset": 12} if fmt == "onnx" else {}
+    path = YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=False, **kwargs)
+    print(f"✅ Exported {weights} -> {path}")
+    return str(path)
+
+
+def load_images(folder: str, limit: int) -> list[np.ndarray]:
+    paths = sorted(p for p in glob.glob(os.path.join(folder, "*")) if p.lower().endswith(IMAGE_EXTS))
+    return [img for img in (cv2.imread(p) for p in paths[:limit]) if img is not None]
+
+
+def _iou(a: Detection, b: Detection) -> float:
+    ix = max(0.0, min(a.x2, b.x2) - max(a.x1, b.x1))
+    iy = max(0.0, min(a.y2, b.y2) - max(a.y1, b.y1))
+    inter = ix * iy
+    union = (a.x2 - a.x1) * (a.y2 - a.y1) + (b.x2 - b.x1) * (b.y2 - b.y1) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def parity(reference: Detector, candidate: Detector, images: list[np.ndarray],
+           min_iou: float = 0.9, max_conf_diff: float = 0.05, min_conf: float = 0.3) -> list[str]:
+    """
+    Every detection scoring >= min_conf on one side needs a same-class box
+    with IoU >= min_iou and a score within max_conf_diff on the other.
+    Returns the mismatches, empty = parity.
+    """
+    problems = []
+    for n, img in enumerate(images):
+        ref, cand = reference.detect(img), candidate.detect(img)
+        for label, a_side, b_side in (("missing from", ref, cand), ("only in", cand, ref)):
+            for a in a_side:
+                # borderline scores may land on either side of the threshold
+                if a.conf < min_conf + max_conf_diff:
+                    continue
+                same_class = [b for b in b_side if b.class_id == a.class_id]
+                match = max(same_class, key=lambda b: _iou(a, b), default=None)
+                if match is None or _iou(a, match) < min_iou or abs(a.conf - match.conf) > max_conf_diff:
+                    name = reference.names.get(a.class_id, a.class_id)
+                    problems.append(f"image {n}: {name} ({a.conf:.2f}) {label} {candidate.backend}")
+    return problems
+
+
+def bench(detector: Detector, images: list[np.ndarray], warmup: int = 3) -> float:
+    for img in images[:warmup]:
+        detector.detect(img)
+    t0 = time.perf_counter()
+    for img in images:
+        detector.detect(img)
+    return len(images) / (time.perf_counter() - t0)
+
+
+def _main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export, check and benchmark detector backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export")
+    p.add_argument("weights")
+    p.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    p.add_argument("--imgsz", type=int, default=DETECTOR_IMGSZ)
+
+    p = sub.add_parser("parity", help="compare an exported model against the .pt")
+    p.add_argument("weights")
+    p.add_argument("exported")
+    p.add_argument("--backend", choices=["onnx", "openvino"], default=None)
+    p.add_argument("--images", required=True)
+    p.add_argument("--limit", type=int, default=50)
+
+    p = sub.add_parser("bench", help="FPS per backend on the same images")
+    p.add_argument("models", nargs="+", help="backend=path, e.g. torch=best.pt onnx=best.onnx")
+    p.add_argument("--images", required=True)
+    p.add_argument("--limit", type=int, default=50)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export(args.weights, args.format, args.imgsz)
+        return 0
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"❌ No images found in {args.images}")
+        return 1
+
+    if args.command == "parity":
+        backend = args.backend or ("onnx" if args.exported.endswith(".onnx") else "openvino")
+        problems = parity(get_detector("torch", args.weights), get_detector(backend, args.exported), images)
+        for line in problems:
+            print(f"⚠️  {line}")
+        if problems:
+            print(f"❌ {len(problems)} mismatch(es) over {len(images)} images")
+            return 1
+        print(f"✅ {backend} matches torch on {len(images)} images")
+        return 0
+
+    print(f"{'backend':<10} {'fps':>8} {'ms/frame':>10}")
+    for spec in args.models:
+        backend, _, path = spec.partition("=")
+        fps = bench(get_detector(backend, path), images)
+        print(f"{backend:<10} {fps:>8.2f} {1000 / fps:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,61 @@
+# food_classes.py
+"""
+Food class registry from fooddataset.yaml (the YOLO training config).
+
+Used by the compact API encoding: item names that are in the registry go out
+as their class id (the index in `names`, same as the model's class ids), any
+other name stays a string. Clients fetch the table once from /api/classes.
+
+Env:
+  FOOD_CLASSES_PATH  default: fooddataset.yaml in the repo root
+"""
+import hashlib
+import os
+from functools import lru_cache
+
+import yaml
+
+
+FOOD_CLASSES_PATH = os.getenv(
+    "FOOD_CLASSES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fooddataset.yaml"),
+)
+
+
+@lru_cache(maxsize=1)
+def class_names() -> tuple[str, ...]:
+    try:
+        with open(FOOD_CLASSES_PATH, encoding="utf-8") as f:
+            names = yaml.safe_load(f).get("names") or []
+    except (OSError, yaml.YAMLError, AttributeError) as e:
+        print(f"⚠️ Food class registry unavailable ({FOOD_CLASSES_PATH}): {e}")
+        return ()
+    # ultralytics also allows {id: name}
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names)]
+    return tuple(str(n) for n in names)
+
+
+@lru_cache(maxsize=1)
+def class_ids() -> dict[str, int]:
+    return {name: i for i, name in enumerate(class_names())}
+
+
+@lru_cache(maxsize=1)
+def registry_version() -> str:
+    return hashlib.sha1("\n".join(class_names()).encode("utf-8")).hexdigest()
+
+
+def encode(name):
+    return class_ids().get(name, name)
+
+
+def compact_rows(rows: list[dict], key: str) -> list[dict]:
+    """Copies of rows with rows[key] swapped for its class id where known."""
+    return [{**row, key: encode(row.get(key))} for row in rows]
+
+
+def compact_menu(menu: dict) -> dict:
+    if not menu.get("items"):
+        return menu
+    return {**menu, "items": compact_rows(menu["items"], "name")}
@@ -0,0 +1,53 @@
+# http_cache.py
+"""
+ETags + conditional GETs for read endpoints.
+
+ETags are derived from the data version counters (versions.py) plus the
+request's query string, so checking If-None-Match costs one _id lookup and
+the real query only runs when something actually changed.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+# per endpoint Cache-Control: always revalidate (304s are cheap), except
+# time-window summaries which may be reused for a minute
+CACHE_MENUS = "no-cache"
+CACHE_MENU = "no-cache"
+CACHE_SUMMARY = "private, no-cache"
+CACHE_SUMMARY_WINDOW = "private, max-age=60"
+# only changes when the model is retrained
+CACHE_CLASSES = "public, max-age=86400"
+
+# rolling week/month windows move even without writes; their ETags roll
+# over every this many seconds
+WINDOW_BUCKET_S = 60
+
+
+def make_etag(request: Request, *parts) -> str:
+    raw = "|".join([request.url.path, str(request.url.query), *map(str, parts)])
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    # weak comparison is what If-None-Match calls for
+    return any(t.removeprefix("W/") == etag for t in tags)
+
+
+def not_modified(request: Request, etag: str, cache_control: str) -> Optional[Response]:
+    """A bodyless 304 if the client's copy is current, else None."""
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
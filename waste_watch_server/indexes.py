@@ -0,0 +1,114 @@
+# indexes.py
+"""
+Indexes the API relies on, created at startup (see main.lifespan).
+
+    python indexes.py           # create missing indexes + print report
+    python indexes.py --check   # report only, exit 1 if anything is missing
+"""
+import asyncio
+import sys
+
+from pymongo import IndexModel
+
+from database import client, collection, rollups_collection, summary_cache_collection  # type: ignore
+
+
+# {menu_num: 1, created_at: 1} also serves menu_num-only filters, $exists
+# and sort on menu_num (it's the index prefix), so no separate {menu_num: 1}.
+LISTING_INDEXES = [
+    IndexModel([("menu_num", 1), ("created_at", 1)], name="menu_num_created_at"),
+    # item lookups, newest row per item for waste increments (the _id
+    # suffix serves the created_at, _id tie-break without an in-memory sort)
+    IndexModel([("item", 1), ("created_at", 1), ("_id", 1)], name="item_created_at_id"),
+    # keyset pages of GET /listing/{name} (item equality, _id range + sort)
+    IndexModel([("item", 1), ("_id", 1)], name="item_id"),
+    IndexModel([("created_at", 1)], name="created_at"),
+]
+
+ROLLUP_INDEXES = [
+    IndexModel([("menu_num", 1), ("item", 1), ("day", 1)], name="rollup_key", unique=True),
+    IndexModel([("day", 1)], name="rollup_day"),
+]
+
+# Mongo drops cached summaries once expires_at has passed
+SUMMARY_CACHE_INDEXES = [
+    IndexModel([("expires_at", 1)], name="summary_cache_ttl", expireAfterSeconds=0),
+]
+
+MANAGED = [
+    (collection, LISTING_INDEXES),
+    (rollups_collection, ROLLUP_INDEXES),
+    (summary_cache_collection, SUMMARY_CACHE_INDEXES),
+]
+
+
+def _key(spec: dict) -> list[tuple]:
+    return [(k, int(v)) for k, v in spec["key"].items()]
+
+
+async def ensure_indexes():
+    """Create any managed index that doesn't exist yet (no-op otherwise)."""
+    for coll, models in MANAGED:
+        await coll.create_indexes(models)
+
+
+async def index_report() -> dict:
+    """
+    Per collection: managed indexes that are missing, indexes nobody has used
+    since the server started, and indexes that aren't managed here.
+    """
+    report = {}
+
+    for coll, models in MANAGED:
+        cursor = await coll.list_indexes()
+        existing = {ix["name"]: _key(ix) async for ix in cursor}
+        wanted = {m.document["name"]: _key(m.document) for m in models}
+
+        missing = [
+            name for name, key in wanted.items()
+            if existing.get(name) != key
+        ]
+        extra = [
+            name for name in existing
+            if name != "_id_" and name not in wanted
+        ]
+
+        try:
+            stats = await coll.aggregate([{"$indexStats": {}}])
+            unused = [
+                s["name"] async for s in stats
+                if s["name"] != "_id_" and s["accesses"]["ops"] == 0
+            ]
+        except Exception:
+            # $indexStats needs clusterMonitor-ish privileges on some hosts
+            unused = []
+
+        report[coll.name] = {"missing": missing, "unused": unused, "extra": extra}
+
+    return report
+
+
+def print_report(report: dict):
+    for name, r in report.items():
+        if not any(r.values()):
+            print(f"✅ {name}: indexes ok")
+            continue
+        for kind in ("missing", "unused", "extra"):
+            if r[kind]:
+                print(f"⚠️  {name}: {kind} indexes: {', '.join(r[kind])}")
+
+
+async def _main(check_only: bool) -> int:
+    try:
+        if not check_only:
+            await ensure_indexes()
+
+        report = await index_report()
+        print_report(report)
+        return 1 if any(r["missing"] for r in report.values()) else 0
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main("--check" in sys.argv)))
@@ -1,40 +1,113 @@
 # main.py
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from database import client as mongo_client, collection, menus_collection  # type: ignore
+import rollups  # type: ignore
+from indexes import ensure_indexes, index_report, print_report  # type: ignore
+from rollups import ROW_LEFTOVERS, ROW_WASTED  # type: ignore
+from summary_cache import cache_key, summary_cache  # type: ignore
+from summary_models import get_summary_model  # type: ignore
+from singleflight import SingleFlight  # type: ignore
+from precompute import SummaryScheduler  # type: ignore
+import precompute  # type: ignore
+import versions  # type: ignore
+from models import MenuItemPatch, WasteEvent, WasteEventBatch  # type: ignore
+from write_behind import WasteBuffer, WASTE_BUFFER_ENABLED  # type: ignore
+from counters import ensure_menu_counter, next_menu_num as allocate_menu_num, raise_menu_counter  # type: ignore
+from responses import MongoJSONResponse, dumps as json_dumps  # type: ignore
+import http_cache  # type: ignore
+import food_classes  # type: ignore
+from compression import CompressionMiddleware  # type: ignore
+from change_feed import ChangeFeed, CHANGE_FEED_HEARTBEAT_S  # type: ignore
 
-import google.genai as genai
 from dotenv import load_dotenv
+import asyncio
 import os
 
 load_dotenv()
 
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY is missing from .env")
+# Gemini by default, SUMMARY_MODEL=local for an offline stand-in
+summary_model = get_summary_model()
 
-# Gemini client
-genai_client = genai.Client(api_key=API_KEY)
+# max seconds a streamed summary may take before it's cut off
+SUMMARY_STREAM_TIMEOUT_S = float(os.getenv("SUMMARY_STREAM_TIMEOUT_S", "60"))
+
+# identical concurrent summary requests share one computation / model call
+waste_flight = SingleFlight()
+summary_flight = SingleFlight()
+
+# optional write-behind for PUT /items/{item_name} (see write_behind.py)
+waste_buffer = (
+    WasteBuffer(flush=lambda events: apply_waste_events(events))
+    if WASTE_BUFFER_ENABLED else None
+)
+
+# live row deltas for /ws/changes and /api/changes/stream (see change_feed.py)
+change_feed = ChangeFeed()
+
+SUMMARY_PROMPT = (
+    "In not more than 6 lines (not including lists): "
+    "Given this food waste data where each item has 'leftovers', "
+    "'wasted', and 'total_waste' (leftovers + wasted), "
+    "{summary_data}, identify the major contributor to total waste "
+    "and approximate its percentage of overall waste. "
+    "Briefly compare leftovers vs explicit wasted portions and "
+    "recommend a short list of similar foods to the items with the "
+    "lowest total waste that could be emphasized more. "
+    "Return the response cleanly in markdown."
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🔗 Connecting to MongoDB...")
-    # You could test a quick ping here if you want
+    await mongo_client.aconnect()
+    try:
+        await ensure_indexes()
+        print_report(await index_report())
+    except Exception as e:
+        # don't refuse to start over indexes, queries still work without them
+        print(f"⚠️  Could not verify indexes: {e}")
+
+    try:
+        await rollups.ensure_rollups()
+    except Exception as e:
+        # summaries keep reading raw rows until the rollups are built
+        print(f"⚠️  Could not build the waste rollups: {e}")
+
+    try:
+        await ensure_menu_counter()
+    except Exception as e:
+        # next_menu_num() re-seeds on first use if this didn't happen
+        print(f"⚠️  Could not seed the menu_num counter: {e}")
+
+    scheduler = SummaryScheduler(compute=shared_waste_summary, narrate=narrate)
+    scheduler.start()
+    if waste_buffer is not None:
+        waste_buffer.start()
+    change_feed.start()
+
     try:
         yield
     finally:
+        if waste_buffer is not None:
+            # last flush while Mongo is still open
+            await waste_buffer.stop()
+        await scheduler.stop()
+        await change_feed.stop()
         print("❌ Closing MongoDB connection...")
-        mongo_client.close()
+        await mongo_client.close()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=MongoJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -42,8 +115,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After", "ETag"],
 )
 
+# gzip/br/zstd, whichever the client prefers, above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
 
 def to_object_id(id_str: str) -> ObjectId:
     try:
@@ -67,14 +144,14 @@ def serialize_menu(doc) -> dict:
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 # ---------- Listing / scanning endpoints ----------
 
 @app.post("/listing")
-def create_listing(listing):
+async def create_listing(listing):
     from models import Listing  # if you want to keep the Pydantic model
     if not isinstance(listing, Listing):
         listing = Listing(**listing)
@@ -83,102 +160,395 @@ def create_listing(listing):
         weekday_index = datetime.now().weekday()
         day_number = weekday_index + 1
         listing.day = day_number
-        result = collection.insert_one(listing.model_dump())
+        doc = listing.model_dump()
+        result = await collection.insert_one(doc)
+        # explicit menu_num, later POST /api/menus must not reuse it
+        await raise_menu_counter(listing.menu_num)
+        await versions.bump(listing.menu_num)
+        change_feed.publish([doc])
         return {"inserted_id": str(result.inserted_id)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.get("/listing")
-def get_all_items():
+# rows per cursor batch for /listing (cursor round trips vs memory)
+LISTING_BATCH_SIZE = int(os.getenv("LISTING_BATCH_SIZE", "500"))
+LISTING_MAX_BATCH_SIZE = 5000
+
+
+async def listing_rows(
+    request: Request,
+    query: dict,
+    after: Optional[str],
+    limit: Optional[int],
+    format: Optional[str],
+    batch_size: Optional[int],
+):
+    """
+    Shared body of the /listing routes.
+    after / limit: keyset pagination on _id, next page's "after" in X-Next-After.
+    format=ndjson (or Accept: application/x-ndjson): one JSON doc per line,
+    serialized as the cursor yields them instead of building the whole list.
+    """
+    if after is not None:
+        query = {**query, "_id": {"$gt": to_object_id(after)}}
+
+    batch = min(batch_size or LISTING_BATCH_SIZE, LISTING_MAX_BATCH_SIZE)
+    cursor = collection.find(query).sort("_id", 1).batch_size(batch)
+
+    ndjson = format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    if ndjson:
+        if limit:
+            cursor = cursor.limit(limit)
+
+        async def lines():
+            try:
+                async for doc in cursor:
+                    yield json_dumps(doc) + b"\n"
+            finally:
+                await cursor.close()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    headers: dict = {}
     try:
-        items = list(collection.find())
-        for item in items:
-            item["_id"] = str(item["_id"])
-        return items
+        if limit:
+            # one extra row tells us whether there's a next page
+            items = await cursor.limit(limit + 1).to_list()
+            if len(items) > limit:
+                items = items[:limit]
+                headers["X-Next-After"] = str(items[-1]["_id"])
+        else:
+            items = await cursor.to_list()
+        # ObjectId / datetime are serialized natively, no conversion loop
+        return MongoJSONResponse(items, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/listing")
+async def get_all_items(
+    request: Request,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+    format: Optional[str] = None,
+    batch_size: Optional[int] = Query(default=None, ge=1),
+):
+    return await listing_rows(request, {}, after, limit, format, batch_size)
+
+
 @app.get("/listing/{name}")
-def get_items_by_name(name: str):
-    try:
-        items = list(collection.find({"item": name}))
-        for item in items:
-            item["_id"] = str(item["_id"])
-        return items
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-<<<<<<< HEAD:waste_watch_server/main.py
-    
-@app.put("/items/{item_name}")
-def increment_item_waste(item_name: str):
-    result = collection.update_one(
-        {"item": item_name},
-=======
+async def get_items_by_name(
+    name: str,
+    request: Request,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+    format: Optional[str] = None,
+    batch_size: Optional[int] = Query(default=None, ge=1),
+):
+    return await listing_rows(request, {"item": name}, after, limit, format, batch_size)
+
 
+# fields of a listing row the API hands back
+LISTING_ROW_PROJECTION = {
+    "item": 1, "qty": 1, "meal_period": 1, "day": 1, "taken": 1, "wasted": 1,
+    "menu_num": 1, "menu_name": 1, "created_at": 1, "rev": 1,
+}
 
-@app.put("/items/{item_id}")
-def increment_item_waste(item_id: str):
-    oid = to_object_id(item_id)
 
-    result = collection.update_one(
-        {"_id": oid},
->>>>>>> 7be6d0190c5265ca7db662e94b55897390438308:waste-watch-server/main.py
-        {"$inc": {"wasted": 1}}
+@app.put("/items/{item_name}")
+async def increment_item_waste(item_name: str):
+    if waste_buffer is not None:
+        # lands on the item's newest menu row within the staleness window
+        if not await waste_buffer.add(item_name):
+            raise HTTPException(status_code=503, detail="Waste buffer is full, retry later")
+        return JSONResponse(status_code=202, content={"item": item_name, "queued": True})
+
+    # one round trip, same target as the buffered path (the item's newest
+    # menu row); the row comes back as it is right after *this* $inc, which
+    # is also the exact row whose rollup needs bumping
+    updated = await collection.find_one_and_update(
+        item_rows_until(item_name, datetime.utcnow()),
+        {"$inc": {"wasted": 1, "rev": 1}},
+        sort=NEWEST_FIRST,
+        projection=LISTING_ROW_PROJECTION,
+        return_document=ReturnDocument.AFTER,
     )
 
-    if result.matched_count == 0:
+    if updated is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
-<<<<<<< HEAD:waste_watch_server/main.py
-    updated = collection.find_one({"item": item_name})
-=======
-    updated = collection.find_one({"_id": oid})
->>>>>>> 7be6d0190c5265ca7db662e94b55897390438308:waste-watch-server/main.py
+    await rollups.bump(updated, wasted=1)
+    await versions.bump(*([updated["menu_num"]] if "menu_num" in updated else []))
+    change_feed.publish([updated])
+
     updated["_id"] = str(updated["_id"])
     return updated
 
 
+def _utc_naive(ts: datetime) -> datetime:
+    # rows store naive UTC datetimes
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+# newest menu row first; served by the {item, created_at, _id} index
+NEWEST_FIRST = [("created_at", -1), ("_id", -1)]
+
+
+def item_rows_until(item: str, ts: datetime) -> dict:
+    """Menu rows of `item` created at or before ts."""
+    return {"item": item, "menu_num": {"$exists": True}, "created_at": {"$lte": ts}}
+
+
+# fields of the row a waste event lands on
+TARGET_ROW_PROJECTION = {
+    "item": 1, "menu_num": 1, "qty": 1, "taken": 1, "wasted": 1, "created_at": 1,
+}
+
+
+async def newest_rows_at(item: str, stamps: list[datetime]) -> list[Optional[dict]]:
+    """
+    For each stamp, the newest menu row for `item` created at or before it
+    (None if there is none). Walks the {item, created_at, _id} index
+    backwards from the latest stamp and stops at the first row old enough
+    for the earliest one, so only rows created inside the stamps' span are read.
+    """
+    cursor = collection.find(
+        item_rows_until(item, max(stamps)), projection=TARGET_ROW_PROJECTION
+    ).sort(NEWEST_FIRST).batch_size(16)
+    earliest = min(stamps)
+
+    rows: list[dict] = []
+    try:
+        async for row in cursor:
+            rows.append(row)
+            if row["created_at"] <= earliest:
+                break
+    finally:
+        await cursor.close()
+
+    return [next((r for r in rows if r["created_at"] <= ts), None) for ts in stamps]
+
+
+# a target row deleted between resolving and writing is re-resolved this often
+WASTE_EVENT_ATTEMPTS = 2
+
+
+async def resolve_targets(events: list[WasteEvent], stamps: list[datetime], pending: list[int]) -> dict:
+    """Event index -> target row (or None) for the pending events, one query per item."""
+    by_item: dict[str, list[int]] = {}
+    for i in pending:
+        by_item.setdefault(events[i].item, []).append(i)
+    resolved = await asyncio.gather(*(
+        newest_rows_at(item, [stamps[i] for i in idx]) for item, idx in by_item.items()
+    ))
+    return {i: row for idx, rows in zip(by_item.values(), resolved) for i, row in zip(idx, rows)}
+
+
+async def apply_waste_events(events: list[WasteEvent]) -> list[dict]:
+    """
+    Bump "wasted" by each event's count on the newest menu row for that item
+    created at or before the event's own timestamp. Targets are resolved
+    with one index-backed query per distinct item, all increments go out as
+    one bulk_write; returns one outcome per event. Only increments that
+    matched a row are reported "applied" and reach the rollups / change feed.
+    """
+    now = datetime.utcnow()
+    stamps = [_utc_naive(e.timestamp) if e.timestamp else now for e in events]
+
+    outcomes: list[Optional[dict]] = [None] * len(events)
+    pending = list(range(len(events)))
+    for _ in range(WASTE_EVENT_ATTEMPTS):
+        targets = await resolve_targets(events, stamps, pending)
+        totals: dict = {}
+        for i in pending:
+            row = targets[i]
+            if row is not None:
+                totals[row["_id"]] = totals.get(row["_id"], 0) + events[i].count
+        if not totals:
+            break
+
+        result = await collection.bulk_write(
+            [
+                UpdateOne({"_id": oid}, {"$inc": {"wasted": n, "rev": 1}})
+                for oid, n in totals.items()
+            ],
+            ordered=False,
+        )
+        # rows as they are now, so the feed doesn't push stale absolute values
+        cursor = collection.find({"_id": {"$in": list(totals)}}, projection=TARGET_ROW_PROJECTION)
+        current = {r["_id"]: r async for r in cursor}
+
+        rows = {r["_id"]: r for r in targets.values() if r is not None}
+        if result.matched_count == len(totals):
+            landed = list(totals)
+        else:
+            # a row that is gone was deleted before our $inc could land
+            landed = [oid for oid in totals if oid in current]
+
+        after = [
+            current.get(oid) or {**rows[oid], "wasted": int(rows[oid].get("wasted") or 0) + totals[oid]}
+            for oid in landed
+        ]
+        # the same row minus this batch: the rollup delta is exactly the increment
+        before = [{**r, "wasted": int(r.get("wasted") or 0) - totals[r["_id"]]} for r in after]
+        if landed:
+            await rollups.apply_changes(after, before)
+            await versions.bump(*{r["menu_num"] for r in after})
+            change_feed.publish_changes(after, before)
+
+        landed_set = set(landed)
+        retry = []
+        for i in pending:
+            row = targets[i]
+            if row is None:
+                continue
+            if row["_id"] in landed_set:
+                outcomes[i] = {
+                    "index": i,
+                    "item": events[i].item,
+                    "station_id": events[i].station_id,
+                    "status": "applied",
+                    "row_id": str(row["_id"]),
+                    "menu_id": row["menu_num"],
+                }
+            else:
+                retry.append(i)
+        pending = retry
+        if not pending:
+            break
+
+    return [
+        o or {"index": i, "item": events[i].item, "station_id": events[i].station_id, "status": "not_found"}
+        for i, o in enumerate(outcomes)
+    ]
+
+
+@app.post("/api/waste-events")
+async def ingest_waste_events(batch: WasteEventBatch):
+    """Batched version of PUT /items/{item_name} for the camera stations."""
+    outcomes = await apply_waste_events(batch.events)
+    return {
+        "applied": sum(o["status"] == "applied" for o in outcomes),
+        "outcomes": outcomes,
+    }
+
+
 # ---------- Waste summary + Gemini ----------
 
+async def shared_waste_summary(menu_id: Optional[int], scope: str):
+    return await waste_flight.do(
+        (menu_id, scope),
+        lambda: compute_waste_summary(menu_id=menu_id, scope=scope),
+    )
+
+
+async def narrate(summary_data: dict) -> str:
+    # same data + same prompt + same model -> same answer, skip Gemini
+    key = cache_key(summary_model.name, SUMMARY_PROMPT, summary_data)
+    cached = await summary_cache.get(key)
+    if cached is not None:
+        return cached
+
+    text = await summary_model.generate(
+        SUMMARY_PROMPT.format(summary_data=summary_data), summary_data
+    )
+
+    await summary_cache.set(key, text)
+    return text
+
+
+async def generate_summary(menu_id: Optional[int], scope: str) -> str:
+    stored = await precompute.get_fresh(menu_id, scope)
+    if stored is not None:
+        return stored["summary"]
+
+    version = await versions.current(menu_id)
+    summary_data = await shared_waste_summary(menu_id, scope)
+    text = await narrate(summary_data)
+    await precompute.store(menu_id, scope, version, summary_data, text)
+    return text
+
+
 @app.get("/api/summary")
-def get_summary(menu_id: Optional[int] = None, scope: str = "menu"):
+async def get_summary(menu_id: Optional[int] = None, scope: str = "menu"):
     """
     menu_id: optional menu_num to filter by
     scope: "menu" | "day" | "week" | "month"
     """
     try:
-        summary_data = compute_waste_summary(menu_id=menu_id, scope=scope)
-
-        response = genai_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=(
-                "In not more than 6 lines (not including lists): "
-                "Given this food waste data where each item has 'leftovers', "
-                "'wasted', and 'total_waste' (leftovers + wasted), "
-                f"{summary_data}, identify the major contributor to total waste "
-                "and approximate its percentage of overall waste. "
-                "Briefly compare leftovers vs explicit wasted portions and "
-                "recommend a short list of similar foods to the items with the "
-                "lowest total waste that could be emphasized more. "
-                "Return the response cleanly in markdown."
-            ),
+        text = await summary_flight.do(
+            (menu_id, scope), lambda: generate_summary(menu_id, scope)
         )
+        return {"summary": text}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-        return {"summary": response.text}
+def sse_event(data: str, event: Optional[str] = None) -> str:
+    # multi-line payloads need one "data:" line each
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+@app.get("/api/summary/stream")
+async def stream_summary(request: Request, menu_id: Optional[int] = None, scope: str = "menu"):
+    """
+    Same as /api/summary, but streams the markdown as Server-Sent Events:
+    "data:" chunks while generating, then an "event: done" (or "event: error").
+    Generation stops if the client goes away or SUMMARY_STREAM_TIMEOUT_S passes.
+    """
+    try:
+        summary_data = await shared_waste_summary(menu_id, scope)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    key = cache_key(summary_model.name, SUMMARY_PROMPT, summary_data)
 
-def compute_waste_summary(menu_id: Optional[int] = None, scope: str = "menu"):
-    now = datetime.utcnow()
+    async def events():
+        cached = await summary_cache.get(key)
+        if cached is not None:
+            yield sse_event(cached)
+            yield sse_event("", event="done")
+            return
 
-    # Only menu rows, not /listing scans
-    query: dict = {"menu_num": {"$exists": True}}
+        chunks = summary_model.stream(
+            SUMMARY_PROMPT.format(summary_data=summary_data), summary_data
+        )
+        parts: list[str] = []
+        try:
+            async with asyncio.timeout(SUMMARY_STREAM_TIMEOUT_S):
+                async for chunk in chunks:
+                    if await request.is_disconnected():
+                        return
+                    parts.append(chunk)
+                    yield sse_event(chunk)
+        except TimeoutError:
+            yield sse_event("Summary timed out", event="error")
+            return
+        except Exception as e:
+            yield sse_event(str(e), event="error")
+            return
+        finally:
+            # stops the upstream generation on disconnect / timeout too
+            await chunks.aclose()
+
+        await summary_cache.set(key, "".join(parts))
+        yield sse_event("", event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    if menu_id is not None:
-        query["menu_num"] = int(menu_id)
+
+def summary_window(scope: str, now: Optional[datetime] = None):
+    """(start, end) created_at window for a summary scope, or (None, None)."""
+    now = now or datetime.utcnow()
 
     start = end = None
     if scope == "day":
@@ -191,60 +561,170 @@ def compute_waste_summary(menu_id: Optional[int] = None, scope: str = "menu"):
         start = now - timedelta(days=30)
         end = now
 
-    if start and end:
-        query["created_at"] = {"$gte": start, "$lt": end}
-
-    docs = list(collection.find(query))
-
-    stats: dict[str, dict[str, int]] = {}
-    # stats[item] = { "leftovers": ..., "wasted": ..., "count": ... }
+    return start, end
 
-    for entry in docs:
-        food = entry["item"]
 
-        qty = int(entry.get("qty", 0) or 0)
-        taken = int(entry.get("taken", 0) or 0)
-        wasted = int(entry.get("wasted", 0) or 0)
+def item_group_stage() -> dict:
+    # one row per item: {_id: item, leftovers, wasted, first_id}
+    return {
+        "$group": {
+            "_id": "$item",
+            "leftovers": {"$sum": ROW_LEFTOVERS},
+            "wasted": {"$sum": ROW_WASTED},
+            # first row seen for this item, keeps ties in insertion order
+            "first_id": {"$min": "$_id"},
+        }
+    }
 
-        leftovers = max(qty - taken, 0)
 
-        if food not in stats:
-            stats[food] = {"leftovers": 0, "wasted": 0, "count": 0}
+def waste_summary_pipeline(query: dict) -> list[dict]:
+    return [
+        {"$match": query},
+        item_group_stage(),
+        {
+            "$project": {
+                "_id": 0,
+                "item": "$_id",
+                "leftovers": "$leftovers",
+                "wasted": "$wasted",
+                "total_waste": {"$add": ["$leftovers", "$wasted"]},
+                "first_id": "$first_id",
+            }
+        },
+        {"$sort": {"total_waste": -1, "first_id": 1}},
+        {"$project": {"first_id": 0}},
+    ]
 
-        stats[food]["leftovers"] += leftovers
-        stats[food]["wasted"] += wasted
-        stats[food]["count"] += 1
 
-    individual_waste = []
-    total_waste = 0
+async def windowed_item_waste(query: dict, menu_id: Optional[int], start: datetime, end: datetime):
+    """
+    Whole days inside [start, end) are read from the rollups, only the partial
+    days at the edges of the window touch raw listing rows. Until the rollups
+    have been built, the whole window comes from raw rows.
+    """
+    if await rollups.is_built():
+        days, edges = rollups.split_window(start, end)
+    else:
+        days, edges = None, [(start, end)]
+
+    parts: list[dict] = []
+    if days:
+        parts += await rollups.rollup_item_totals(menu_id, *days)
+    for lo, hi in edges:
+        edge_query = {**query, "created_at": {"$gte": lo, "$lt": hi}}
+        cursor = await collection.aggregate([{"$match": edge_query}, item_group_stage()])
+        parts += await cursor.to_list()
+
+    stats: dict[str, dict] = {}
+    for p in parts:
+        s = stats.setdefault(p["_id"], {"leftovers": 0, "wasted": 0, "first_id": None})
+        s["leftovers"] += p["leftovers"]
+        s["wasted"] += p["wasted"]
+        if p.get("first_id") is not None and (s["first_id"] is None or p["first_id"] < s["first_id"]):
+            s["first_id"] = p["first_id"]
+
+    ordered = sorted(
+        stats.items(),
+        key=lambda kv: (-(kv[1]["leftovers"] + kv[1]["wasted"]), str(kv[1]["first_id"] or "")),
+    )
+    return [
+        {
+            "item": food,
+            "leftovers": s["leftovers"],
+            "wasted": s["wasted"],
+            "total_waste": s["leftovers"] + s["wasted"],
+        }
+        for food, s in ordered
+    ]
+
+
+async def compute_waste_summary(menu_id: Optional[int] = None, scope: str = "menu"):
+    # Only menu rows, not /listing scans
+    query: dict = {"menu_num": {"$exists": True}}
 
-    for food, s in stats.items():
-        item_total = s["leftovers"] + s["wasted"]
-        total_waste += item_total
-        individual_waste.append(
-            {
-                "item": food,
-                "leftovers": s["leftovers"],
-                "wasted": s["wasted"],
-                "total_waste": item_total,
-            }
-        )
+    if menu_id is not None:
+        query["menu_num"] = int(menu_id)
 
-    individual_waste.sort(key=lambda x: x["total_waste"], reverse=True)
+    start, end = summary_window(scope)
+    if start and end:
+        individual_waste = await windowed_item_waste(query, menu_id, start, end)
+    else:
+        # per-item totals are grouped and sorted by Mongo, only one row per
+        # item comes back over the wire
+        cursor = await collection.aggregate(waste_summary_pipeline(query))
+        individual_waste = await cursor.to_list()
+    total_waste = sum(row["total_waste"] for row in individual_waste)
 
     return {
         "individual_waste": individual_waste,
         "total_waste": total_waste,
     }
 
+def summary_etag_window(scope: str, now: Optional[datetime] = None) -> str:
+    """The part of a waste-summary ETag that moves with the clock."""
+    now = now or datetime.utcnow()
+    if scope == "day":
+        return now.date().isoformat()
+    if scope in ("week", "month"):
+        return str(int(now.timestamp()) // http_cache.WINDOW_BUCKET_S)
+    return ""
+
+
 @app.get("/api/waste-summary")
-def create_summary(menu_id: Optional[int] = None, scope: str = "menu"):
+async def create_summary(
+    request: Request,
+    menu_id: Optional[int] = None,
+    scope: str = "menu",
+    compact: bool = False,
+):
+    """compact=true: item names from the class registry come back as class ids."""
 
     try:
-        return compute_waste_summary(menu_id=menu_id, scope=scope)
+        version = await versions.current(menu_id)
+        etag = http_cache.make_etag(request, version, summary_etag_window(scope))
+        cache_control = (
+            http_cache.CACHE_SUMMARY_WINDOW if scope in ("week", "month") else http_cache.CACHE_SUMMARY
+        )
+        cached = http_cache.not_modified(request, etag, cache_control)
+        if cached is not None:
+            return cached
+
+        stored = await precompute.get_fresh(menu_id, scope)
+        data = stored["data"] if stored is not None else await shared_waste_summary(menu_id, scope)
+        if compact:
+            # copy, the coalesced result is shared with other callers
+            data = {**data, "individual_waste": food_classes.compact_rows(data["individual_waste"], "item")}
+        return MongoJSONResponse(data, headers=http_cache.cache_headers(etag, cache_control))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+
+@app.get("/api/classes")
+async def get_classes(request: Request):
+    """Class id -> name table for decoding compact responses."""
+    etag = http_cache.make_etag(request, food_classes.registry_version())
+    cached = http_cache.not_modified(request, etag, http_cache.CACHE_CLASSES)
+    if cached is not None:
+        return cached
+    return MongoJSONResponse(
+        {"version": food_classes.registry_version(), "names": list(food_classes.class_names())},
+        headers=http_cache.cache_headers(etag, http_cache.CACHE_CLASSES),
+    )
+
+
+@app.get("/api/stats")
+async def get_stats():
+    """Coalescing + summary cache counters since startup."""
+    return {
+        "coalescing": {
+            "waste_summary": waste_flight.stats(),
+            "summary": summary_flight.stats(),
+        },
+        "summary_cache": summary_cache.stats(),
+        "waste_buffer": waste_buffer.stats() if waste_buffer is not None else None,
+        "change_feed": change_feed.stats(),
+    }
+
 # ---------- Menu helpers + CRUD ----------
 
 def listings_to_menu(menu_num: int, docs: list[dict]) -> dict:
@@ -262,6 +742,7 @@ def listings_to_menu(menu_num: int, docs: list[dict]) -> dict:
                 "quantity": d["qty"],
                 "taken": d.get("taken", 0),
                 "wasted": d.get("wasted", 0),
+                "rev": d.get("rev", 0),
             }
             for d in docs
         ],
@@ -269,18 +750,14 @@ def listings_to_menu(menu_num: int, docs: list[dict]) -> dict:
 
 
 @app.post("/api/menus")
-def create_menu(menu: dict = Body(...)):
+async def create_menu(menu: dict = Body(...)):
     try:
         name = menu["name"]
         meal_period = int(menu["meal_period"])
         items = menu["items"]
         day = menu.get("day")
 
-        max_doc = collection.find_one(
-            {"menu_num": {"$exists": True}},
-            sort=[("menu_num", -1)]
-        )
-        next_menu_num = (max_doc["menu_num"] if max_doc else 0) + 1
+        next_menu_num = await allocate_menu_num()
         now = datetime.utcnow()
 
         docs = []
@@ -297,7 +774,10 @@ def create_menu(menu: dict = Body(...)):
                 "created_at": now,
             })
 
-        collection.insert_many(docs)
+        await collection.insert_many(docs)
+        await rollups.add_rows(docs)
+        await versions.bump(next_menu_num)
+        change_feed.publish(docs)
 
         return listings_to_menu(next_menu_num, docs)
 
@@ -307,49 +787,143 @@ def create_menu(menu: dict = Body(...)):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+MENU_FIELDS = ("id", "name", "meal_period", "items", "item_count")
+MENU_DEFAULT_FIELDS = ("id", "name", "meal_period", "items")
+MENU_INDEX_FIELDS = ("id", "name", "meal_period", "item_count")
+MENUS_MAX_PAGE = 200
+
+
+async def menu_nums_after(after: Optional[int], n: int) -> list[int]:
+    """
+    The first n menu numbers above `after`, read off the menu_num index.
+    Each pass asks for about as many rows as the missing menus should have
+    (going by the rows per menu seen so far) and the next one seeks past the
+    last menu seen, so the cost follows the page size, not the menu count.
+    """
+    nums: list[int] = []
+    # numeric bound instead of $exists, so the query stays covered by the index
+    last = float("-inf") if after is None else int(after)
+    rows_read = 0
+    while len(nums) < n:
+        per_menu = -(-rows_read // len(nums)) if nums else 1
+        want = (n - len(nums)) * per_menu
+        cursor = collection.find(
+            {"menu_num": {"$gt": last}}, projection={"_id": 0, "menu_num": 1}
+        ).sort("menu_num", 1).limit(want)
+        got = [r["menu_num"] async for r in cursor]
+        rows_read += len(got)
+        for num in got:
+            if num != last:
+                nums.append(num)
+                last = num
+        if len(got) < want:
+            break
+    return nums[:n]
+
+
 @app.get("/api/menus")
-def list_menus():
+async def list_menus(
+    request: Request,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MENUS_MAX_PAGE),
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+    compact: bool = False,
+):
+    """
+    after / limit: keyset pagination on menu_num. When there are more menus,
+        the "after" value for the next page is in the X-Next-After header.
+    fields: comma separated subset of id,name,meal_period,items,item_count
+    view=index: lightweight list for dropdowns (id, name, meal_period, item_count),
+        MENUS_MAX_PAGE menus per page unless a smaller limit is given
+    compact=true: item names from the class registry come back as class ids
+        (see /api/classes)
+    Without any of these it returns every menu with its items, as before.
+    """
+    if view == "index":
+        wanted = MENU_INDEX_FIELDS
+    elif fields:
+        wanted = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = set(wanted) - set(MENU_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    else:
+        wanted = MENU_DEFAULT_FIELDS
+
     try:
-        pipeline = [
-            {"$match": {"menu_num": {"$exists": True}}},
-            {
-                "$group": {
-                    "_id": "$menu_num",
-                    "menu_num": {"$first": "$menu_num"},
-                    "menu_name": {"$first": "$menu_name"},
-                    "meal_period": {"$first": "$meal_period"},
-                    "items": {
-                        "$push": {
-                            "name": "$item",
-                            "quantity": "$qty",
-                            "taken": {"$ifNull": ["$taken", 0]},
-                            "wasted": {"$ifNull": ["$wasted", 0]},
-                        }
-                    },
+        # any menu write bumps the global version, and the query string
+        # (page, fields, view) is part of the ETag
+        etag = http_cache.make_etag(request, await versions.current())
+        cached = http_cache.not_modified(request, etag, http_cache.CACHE_MENUS)
+        if cached is not None:
+            return cached
+        headers = http_cache.cache_headers(etag, http_cache.CACHE_MENUS)
+
+        match: dict = {"menu_num": {"$exists": True}}
+        if view == "index" and limit is None:
+            # the index view is paged too, a dropdown never needs every menu at once
+            limit = MENUS_MAX_PAGE
+
+        if after is not None:
+            match = {"menu_num": {"$gt": int(after)}}
+        if limit is not None:
+            # one extra number tells us whether there's a next page
+            nums = await menu_nums_after(after, limit + 1)
+            page = nums[:limit]
+            if len(nums) > limit:
+                headers["X-Next-After"] = str(page[-1])
+            match = {"menu_num": {"$in": page}}
+
+        group: dict = {
+            "_id": "$menu_num",
+            "menu_name": {"$first": "$menu_name"},
+            "meal_period": {"$first": "$meal_period"},
+        }
+        if "items" in wanted:
+            group["items"] = {
+                "$push": {
+                    "name": "$item",
+                    "quantity": "$qty",
+                    "taken": {"$ifNull": ["$taken", 0]},
+                    "wasted": {"$ifNull": ["$wasted", 0]},
+                    "rev": {"$ifNull": ["$rev", 0]},
                 }
-            },
-            {"$sort": {"menu_num": 1}},
+            }
+        if "item_count" in wanted:
+            group["item_count"] = {"$sum": 1}
+
+        pipeline = [
+            {"$match": match},
+            {"$group": group},
+            {"$sort": {"_id": 1}},
         ]
 
-        agg = list(collection.aggregate(pipeline))
-        menus = [
-            {
-                "id": m["menu_num"],
+        cursor = await collection.aggregate(pipeline)
+        menus = []
+        async for m in cursor:
+            menu = {
+                "id": m["_id"],
                 "name": m.get("menu_name", ""),
                 "meal_period": m.get("meal_period"),
-                "items": m["items"],
+                "items": m.get("items"),
+                "item_count": m.get("item_count"),
             }
-            for m in agg
-        ]
+            menu = {k: menu[k] for k in wanted}
+            menus.append(food_classes.compact_menu(menu) if compact else menu)
 
-        return menus
+        return MongoJSONResponse(menus, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/api/menus/{menu_id}")
-def get_menu(menu_id: int):
-    docs = list(collection.find({"menu_num": int(menu_id)}))
+async def get_menu(request: Request, menu_id: int, compact: bool = False):
+    etag = http_cache.make_etag(request, await versions.current(menu_id))
+    cached = http_cache.not_modified(request, etag, http_cache.CACHE_MENU)
+    if cached is not None:
+        return cached
+
+    docs = await collection.find({"menu_num": int(menu_id)}).to_list()
     if not docs:
         raise HTTPException(status_code=404, detail="Menu not found")
 
@@ -357,11 +931,15 @@ def get_menu(menu_id: int):
         if "wasted" not in doc:
             doc["wasted"] = 0
 
-    return listings_to_menu(int(menu_id), docs)
+    menu = listings_to_menu(int(menu_id), docs)
+    return MongoJSONResponse(
+        food_classes.compact_menu(menu) if compact else menu,
+        headers=http_cache.cache_headers(etag, http_cache.CACHE_MENU),
+    )
 
 
 @app.put("/api/menus/{menu_id}")
-def update_menu(menu_id: int, menu: dict = Body(...)):
+async def update_menu(menu_id: int, menu: dict = Body(...)):
     try:
         menu_id = int(menu_id)
         name = menu["name"]
@@ -369,14 +947,20 @@ def update_menu(menu_id: int, menu: dict = Body(...)):
         items = menu["items"]
         day = menu.get("day")
 
-        existing = collection.find_one({"menu_num": menu_id})
-        base_created_at = existing.get("created_at") if existing else datetime.utcnow()
+        existing = await collection.find({"menu_num": menu_id}).to_list()
+        base_created_at = existing[0].get("created_at") if existing else datetime.utcnow()
 
-        collection.delete_many({"menu_num": menu_id})
+        # stored rows per item name, matched to incoming items in order
+        unmatched: dict[str, list[dict]] = {}
+        for row in existing:
+            unmatched.setdefault(row["item"], []).append(row)
 
         docs = []
+        inserts: list[dict] = []
+        # (row as read, row as written, update)
+        updates: list[tuple[dict, dict, dict]] = []
         for it in items:
-            docs.append({
+            wanted = {
                 "item": it["name"],
                 "qty": int(it["quantity"]),
                 "meal_period": meal_period,
@@ -385,23 +969,280 @@ def update_menu(menu_id: int, menu: dict = Body(...)):
                 "wasted": int(it.get("wasted", 0)),
                 "menu_num": menu_id,
                 "menu_name": name,
-                "created_at": base_created_at,
-            })
+            }
+
+            candidates = unmatched.get(wanted["item"])
+            if candidates:
+                # prefer a row that's already identical, so it isn't rewritten
+                pick = next(
+                    (i for i, r in enumerate(candidates)
+                     if all(r.get(k) == v for k, v in wanted.items())),
+                    0,
+                )
+                row = candidates.pop(pick)
+                changed = {k: v for k, v in wanted.items() if row.get(k) != v}
+                if changed:
+                    after = {**row, **changed, "rev": row.get("rev", 0) + 1}
+                    updates.append((row, after, {"$set": changed, "$inc": {"rev": 1}}))
+                    row = after
+                docs.append(row)
+            else:
+                row = {**wanted, "created_at": base_created_at}
+                inserts.append(row)
+                docs.append(row)
+
+        deletes = [row for rows in unmatched.values() for row in rows]
+
+        # unchanged rows keep their _id and aren't written at all
+        if not (inserts or updates or deletes):
+            return listings_to_menu(menu_id, docs)
+
+        # Rows are only rewritten / deleted if nobody touched them since the
+        # read above (same rev), otherwise a camera increment landing in
+        # between would be overwritten while its rollup delta stays.
+        # Check every rev first and write nothing at all on a conflict.
+        touched = [before for before, _, _ in updates] + deletes
+        if touched:
+            cursor = collection.find(
+                {"_id": {"$in": [r["_id"] for r in touched]}}, projection={"rev": 1}
+            )
+            current = {r["_id"]: r.get("rev") or 0 async for r in cursor}
+            conflicts = [r["item"] for r in touched if current.get(r["_id"]) != (r.get("rev") or 0)]
+            if conflicts:
+                raise HTTPException(
+                    status_code=409,
+                    detail={
+                        "message": "Menu was changed by someone else, reload it and retry",
+                        "items": conflicts,
+                    },
+                )
+
+        # one ordered round trip; the rev filters still guard the short gap
+        # since the check
+        result = await collection.bulk_write(
+            [UpdateOne(rev_filter(before), update) for before, _, update in updates]
+            + [DeleteOne(rev_filter(before)) for before in deletes]
+            + [InsertOne(row) for row in inserts],  # fills in each row's _id
+            ordered=True,
+        )
 
-        if docs:
-            collection.insert_many(docs)
+        applied, deleted, conflicts = updates, deletes, []
+        if result.matched_count < len(updates) or result.deleted_count < len(deletes):
+            # someone got in after the check: keep what went through and
+            # report the rows that still show the other writer's version
+            cursor = collection.find({"_id": {"$in": [r["_id"] for r in touched]}})
+            now_rows = {r["_id"]: r async for r in cursor}
+
+            def landed(u: tuple[dict, dict, dict]) -> bool:
+                row = now_rows.get(u[0]["_id"])
+                return row is not None and all(row.get(k) == v for k, v in u[2]["$set"].items())
+
+            applied = [u for u in updates if landed(u)]
+            deleted = [row for row in deletes if row["_id"] not in now_rows]
+            conflicts = [u[0]["item"] for u in updates if not landed(u)] + [
+                row["item"] for row in deletes if row["_id"] in now_rows
+            ]
+
+        added = inserts + [after for _, after, _ in applied]
+        removed = [before for before, _, _ in applied] + deleted
+        if not existing:
+            # PUT created this menu under its own number
+            await raise_menu_counter(menu_id)
+        await rollups.apply_changes(added, removed)
+        await versions.bump(menu_id)
+        change_feed.publish_changes(added, removed)
+
+        if conflicts:
+            # partly applied, so not a 409: the menu as it is now, plus the
+            # items whose edit lost
+            fresh = await collection.find({"menu_num": menu_id}).to_list()
+            return {**listings_to_menu(menu_id, fresh), "conflicts": conflicts}
 
         return listings_to_menu(menu_id, docs)
 
+    except HTTPException:
+        raise
     except KeyError as e:
         raise HTTPException(status_code=400, detail=f"Missing field {e}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def rev_filter(row: dict) -> dict:
+    """Matches the row only while it still has the rev it was read with."""
+    rev = row.get("rev")
+    return {"_id": row["_id"], "rev": rev if rev else {"$in": [0, None]}}
+
+
+ITEM_ROW_PROJECTION = {
+    "menu_num": 1, "item": 1, "qty": 1, "taken": 1, "wasted": 1,
+    "rev": 1, "created_at": 1,
+}
+
+
+def serialize_item_row(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "menu_id": doc["menu_num"],
+        "name": doc["item"],
+        "quantity": doc.get("qty", 0),
+        "taken": doc.get("taken", 0),
+        "wasted": doc.get("wasted", 0),
+        "rev": doc.get("rev", 0),
+    }
+
+
+@app.patch("/api/menus/{menu_id}/items/{item_name}")
+async def patch_menu_item(menu_id: int, item_name: str, patch: MenuItemPatch):
+    """
+    Change one item's taken/wasted without resending the whole menu.
+    Absolute values are $set, *_inc values are $inc'd; a negative *_inc
+    that would take a counter below 0 is refused (409). With "rev" the write
+    only applies if nobody changed the row since (409 otherwise).
+    """
+    sets = {k: v for k, v in (("taken", patch.taken), ("wasted", patch.wasted)) if v is not None}
+    incs = {k: v for k, v in (("taken", patch.taken_inc), ("wasted", patch.wasted_inc)) if v}
+    if not sets and not incs:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    if sets.keys() & incs.keys():
+        raise HTTPException(status_code=400, detail="Can't set and increment the same field")
+
+    query: dict = {"menu_num": int(menu_id), "item": item_name}
+    if patch.rev is not None:
+        # rows that were never patched have no rev yet, that counts as 0
+        query["rev"] = patch.rev if patch.rev else {"$in": [0, None]}
+    # decrements only apply while the counter stays >= 0 (checked in the write)
+    floors = {k: -v for k, v in incs.items() if v < 0}
+    for k, floor in floors.items():
+        query[k] = {"$gte": floor}
+
+    update: dict = {"$inc": {**incs, "rev": 1}}
+    if sets:
+        update["$set"] = sets
+
+    # BEFORE: one round trip gives both versions (after = before + patch),
+    # the rollups need the old row to apply the delta
+    before = await collection.find_one_and_update(
+        query,
+        update,
+        projection=ITEM_ROW_PROJECTION,
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if before is None:
+        current = await collection.find_one(
+            {"menu_num": int(menu_id), "item": item_name},
+            projection=ITEM_ROW_PROJECTION,
+        )
+        if current is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        below = [k for k, floor in floors.items() if (current.get(k) or 0) < floor]
+        if below:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": f"{', '.join(below)} can't go below 0",
+                    "item": serialize_item_row(current),
+                },
+            )
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Item was changed by someone else", "item": serialize_item_row(current)},
+        )
+
+    after = {**before, **sets, "rev": before.get("rev", 0) + 1}
+    for k, v in incs.items():
+        after[k] = after.get(k, 0) + v
+
+    await rollups.apply_changes([after], [before])
+    await versions.bump(int(menu_id))
+    change_feed.publish_changes([after], [before])
+
+    return serialize_item_row(after)
+
+
 @app.delete("/api/menus/{menu_id}", status_code=204)
-def delete_menu(menu_id: int):
-    result = collection.delete_many({"menu_num": int(menu_id)})
+async def delete_menu(menu_id: int):
+    result = await collection.delete_many({"menu_num": int(menu_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Menu not found")
+    await rollups.drop_menu(int(menu_id))
+    await versions.bump(int(menu_id))
+    change_feed.menu_deleted(int(menu_id))
     return None
+
+
+# ---------- Live changes ----------
+
+def changes_message(batch: list[dict]) -> str:
+    if batch and batch[0].get("type") == "resync":
+        return json_dumps(batch[0]).decode()
+    return json_dumps({"type": "changes", "changes": batch}).decode()
+
+
+@app.websocket("/ws/changes")
+async def changes_ws(websocket: WebSocket, menu_id: Optional[List[int]] = Query(default=None)):
+    """
+    Row deltas as {"type": "changes", "changes": [...]}, {"type": "resync"}
+    when the client fell behind, {"type": "ping"} when idle.
+    menu_id (repeatable) limits it to those menus; the client can switch
+    later by sending {"menus": [1, 2]} or {"menus": null} for all of them.
+    """
+    await websocket.accept()
+    sub = change_feed.subscribe(menu_id)
+
+    async def listen():
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if isinstance(message, dict) and "menus" in message:
+                    sub.set_menus(message["menus"])
+        except (WebSocketDisconnect, ValueError, TypeError):
+            pass
+        finally:
+            # wakes the sender loop below
+            sub.close()
+
+    listener = asyncio.create_task(listen())
+    try:
+        while True:
+            batch = await sub.next(timeout=CHANGE_FEED_HEARTBEAT_S)
+            if batch is None:
+                break
+            # awaiting the send is the backpressure: while a slow client
+            # drains, new deltas coalesce in its subscription
+            await websocket.send_text(changes_message(batch) if batch else '{"type":"ping"}')
+    except WebSocketDisconnect:
+        pass
+    finally:
+        listener.cancel()
+        change_feed.unsubscribe(sub)
+
+
+@app.get("/api/changes/stream")
+async def changes_stream(request: Request, menu_id: Optional[List[int]] = Query(default=None)):
+    """
+    Same feed as /ws/changes over Server-Sent Events: "changes" and
+    "resync" events, plus a comment line as keep-alive.
+    """
+    sub = change_feed.subscribe(menu_id)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                batch = await sub.next(timeout=CHANGE_FEED_HEARTBEAT_S)
+                if batch is None:
+                    return
+                if not batch:
+                    yield ": ping\n\n"
+                    continue
+                event = "resync" if batch[0].get("type") == "resync" else "changes"
+                yield sse_event(changes_message(batch), event=event)
+        finally:
+            change_feed.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
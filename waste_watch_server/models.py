@@ -1,6 +1,7 @@
 # models.py
 from __future__ import annotations
 
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
@@ -44,3 +45,33 @@ class MenuModel(BaseModel):
         "populate_by_name": True,
         "extra": "ignore",
     }
+
+
+class MenuItemPatch(BaseModel):
+    # absolute values ($set) ...
+    taken: Optional[int] = Field(default=None, ge=0)
+    wasted: Optional[int] = Field(default=None, ge=0)
+    # ... or relative changes ($inc)
+    taken_inc: Optional[int] = None
+    wasted_inc: Optional[int] = None
+    # optimistic concurrency: only apply if the row is still at this rev
+    rev: Optional[int] = None
+
+    model_config = {
+        "extra": "forbid",
+    }
+
+
+class WasteEvent(BaseModel):
+    item: str
+    count: int = Field(default=1, ge=1)
+    timestamp: Optional[datetime] = None   # when it was seen, default now
+    station_id: Optional[str] = None
+
+    model_config = {
+        "extra": "ignore",
+    }
+
+
+class WasteEventBatch(BaseModel):
+    events: List[WasteEvent] = Field(min_length=1, max_length=1000)
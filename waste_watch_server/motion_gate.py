@@ -0,0 +1,93 @@
+# motion_gate.py
+"""
+Cheap motion gate in front of the detector.
+
+Each frame is shrunk to a small blurred grayscale image and compared with a
+slowly updated background (running average, so lighting drift over the day
+is absorbed). The detector only runs when enough pixels changed, and keeps
+running for a cooldown afterwards so a tray that slides in and stops still
+gets looked at.
+
+.env settings:
+    CAM_MOTION_GATE        "0" to run the detector on every frame (default 1)
+    CAM_MOTION_THRESHOLD   per-pixel gray-level change that counts (default 25)
+    CAM_MOTION_MIN_AREA    fraction of pixels that must change (default 0.01)
+    CAM_MOTION_COOLDOWN_S  keep detecting this long after motion (default 2)
+    CAM_MOTION_MAX_IDLE_S  run anyway after this long without motion, 0 = never (default 30)
+    CAM_MOTION_WIDTH       width the comparison runs at (default 160)
+"""
+import os
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+CAM_MOTION_GATE = os.getenv("CAM_MOTION_GATE", "1") == "1"
+CAM_MOTION_THRESHOLD = int(os.getenv("CAM_MOTION_THRESHOLD", "25"))
+CAM_MOTION_MIN_AREA = float(os.getenv("CAM_MOTION_MIN_AREA", "0.01"))
+CAM_MOTION_COOLDOWN_S = float(os.getenv("CAM_MOTION_COOLDOWN_S", "2"))
+CAM_MOTION_MAX_IDLE_S = float(os.getenv("CAM_MOTION_MAX_IDLE_S", "30"))
+CAM_MOTION_WIDTH = int(os.getenv("CAM_MOTION_WIDTH", "160"))
+
+# how fast the background follows the scene, per frame
+BACKGROUND_RATE = 0.05
+
+
+class MotionGate:
+    def __init__(
+        self,
+        threshold: int = CAM_MOTION_THRESHOLD,
+        min_area: float = CAM_MOTION_MIN_AREA,
+        cooldown_s: float = CAM_MOTION_COOLDOWN_S,
+        max_idle_s: float = CAM_MOTION_MAX_IDLE_S,
+        width: int = CAM_MOTION_WIDTH,
+    ):
+        self.threshold = threshold
+        self.min_area = min_area
+        self.cooldown_s = cooldown_s
+        self.max_idle_s = max_idle_s
+        self.width = width
+        self._background: Optional[np.ndarray] = None
+        self._last_motion = float("-inf")
+        self._last_run = float("-inf")
+        self.frames = 0
+        self.passed = 0
+
+    def _small_gray(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, h * self.width // w)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, frame: np.ndarray) -> float:
+        """Share of pixels that differ from the background; updates it too."""
+        gray = self._small_gray(frame)
+        if self._background is None:
+            self._background = gray.astype(np.float32)
+            return 1.0
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        changed = np.count_nonzero(diff > self.threshold) / diff.size
+        cv2.accumulateWeighted(gray, self._background, BACKGROUND_RATE)
+        return changed
+
+    def should_run(self, frame: np.ndarray, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        if self.changed_fraction(frame) >= self.min_area:
+            self._last_motion = now
+
+        run = (
+            now - self._last_motion <= self.cooldown_s
+            or (self.max_idle_s > 0 and now - self._last_run >= self.max_idle_s)
+        )
+        if run:
+            self._last_run = now
+            self.passed += 1
+        return run
+
+    def summary(self) -> str:
+        skipped = self.frames - self.passed
+        share = skipped / self.frames if self.frames else 0.0
+        return f"motion gate skipped {skipped}/{self.frames} ({share:.0%})"
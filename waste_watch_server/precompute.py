@@ -0,0 +1,126 @@
+# precompute.py
+"""
+Background pre-computation of the day/week/month reports.
+
+Every SUMMARY_PRECOMPUTE_INTERVAL_S the scheduler (started from
+main.lifespan) makes sure there is a stored numeric summary + narrative for
+the global view and the most recent menus. A stored report is served as-is
+while its data version (versions.py) is unchanged and it is younger than
+SUMMARY_MAX_AGE_S (the time windows keep sliding even without writes).
+
+.env settings:
+    SUMMARY_PRECOMPUTE_INTERVAL_S  seconds between runs, 0 disables (default 600)
+    SUMMARY_PRECOMPUTE_SCOPES      comma separated (default "day,week,month")
+    SUMMARY_PRECOMPUTE_MENUS       how many of the newest menus (default 20)
+    SUMMARY_MAX_AGE_S              max age of a stored report (default 900)
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+import versions  # type: ignore
+from database import collection, precomputed_collection  # type: ignore
+
+
+SUMMARY_PRECOMPUTE_INTERVAL_S = float(os.getenv("SUMMARY_PRECOMPUTE_INTERVAL_S", "600"))
+SUMMARY_PRECOMPUTE_SCOPES = [
+    s.strip() for s in os.getenv("SUMMARY_PRECOMPUTE_SCOPES", "day,week,month").split(",") if s.strip()
+]
+SUMMARY_PRECOMPUTE_MENUS = int(os.getenv("SUMMARY_PRECOMPUTE_MENUS", "20"))
+SUMMARY_MAX_AGE_S = float(os.getenv("SUMMARY_MAX_AGE_S", "900"))
+
+
+def _doc_id(menu_id: Optional[int], scope: str) -> str:
+    return f"{versions.version_key(menu_id)}:{scope}"
+
+
+async def get_fresh(menu_id: Optional[int], scope: str) -> Optional[dict]:
+    """Stored {data, summary, version, generated_at} if still valid, else None."""
+    doc = await precomputed_collection.find_one({"_id": _doc_id(menu_id, scope)})
+    if doc is None:
+        return None
+    if doc["generated_at"] < datetime.utcnow() - timedelta(seconds=SUMMARY_MAX_AGE_S):
+        return None
+    if doc["version"] != await versions.current(menu_id):
+        return None
+    return doc
+
+
+async def store(menu_id: Optional[int], scope: str, version: int, data: dict, summary: str):
+    await precomputed_collection.replace_one(
+        {"_id": _doc_id(menu_id, scope)},
+        {
+            "menu_id": menu_id,
+            "scope": scope,
+            "version": version,
+            "data": data,
+            "summary": summary,
+            "generated_at": datetime.utcnow(),
+        },
+        upsert=True,
+    )
+
+
+class SummaryScheduler:
+    def __init__(
+        self,
+        compute: Callable[[Optional[int], str], Awaitable[dict]],
+        narrate: Callable[[dict], Awaitable[str]],
+        interval_s: float = SUMMARY_PRECOMPUTE_INTERVAL_S,
+    ):
+        self.compute = compute
+        self.narrate = narrate
+        self.interval_s = interval_s
+        self._task: Optional[asyncio.Task] = None
+
+    async def _targets(self) -> list[Optional[int]]:
+        menu_nums = await collection.distinct("menu_num")
+        newest = sorted(n for n in menu_nums if n is not None)[-SUMMARY_PRECOMPUTE_MENUS:]
+        return [None] + newest
+
+    async def refresh(self, menu_id: Optional[int], scope: str) -> bool:
+        """Regenerate one report if it's stale. True if it was regenerated."""
+        if await get_fresh(menu_id, scope) is not None:
+            return False
+
+        # read the version first: a write landing mid-computation leaves the
+        # stored report one version behind, so it gets redone next time
+        version = await versions.current(menu_id)
+        data = await self.compute(menu_id, scope)
+        summary = await self.narrate(data)
+        await store(menu_id, scope, version, data, summary)
+        return True
+
+    async def run_once(self) -> int:
+        regenerated = 0
+        for menu_id in await self._targets():
+            for scope in SUMMARY_PRECOMPUTE_SCOPES:
+                try:
+                    regenerated += await self.refresh(menu_id, scope)
+                except Exception as e:
+                    print(f"⚠️  Precompute failed for menu={menu_id} scope={scope}: {e}")
+        return regenerated
+
+    async def _run_forever(self):
+        while True:
+            try:
+                n = await self.run_once()
+                if n:
+                    print(f"🧮 Precomputed {n} report(s)")
+            except Exception as e:
+                print(f"⚠️  Precompute run failed: {e}")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self):
+        if self.interval_s > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
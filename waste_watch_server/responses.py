@@ -0,0 +1,32 @@
+# responses.py
+"""
+orjson-backed JSON responses that understand Mongo documents as-is:
+ObjectId becomes its hex string, datetime its ISO string.
+
+FastAPI runs jsonable_encoder over anything a route *returns* (even with a
+custom default_response_class), so hot routes return MongoJSONResponse
+directly to skip that pass entirely.
+"""
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    # orjson handles datetime natively (ISO 8601, same as jsonable_encoder)
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MongoJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,294 @@
+# rollups.py
+"""
+Materialized waste totals, one doc per (menu_num, item, day).
+
+The listing rows stay the source of truth. Every write path in main.py also
+updates the matching rollup docs, so day/week/month summaries only have to
+sum a handful of rollup docs instead of rescanning raw rows.
+
+The first start of the API on a database without rollups builds them from
+the existing rows (main.lifespan -> ensure_rollups) and leaves a "rollups
+built" marker. Until the marker exists, summaries read raw rows only, so
+history that was never rolled up is not silently left out.
+
+Rebuild / check against the raw rows:
+
+    python rollups.py rebuild
+    python rollups.py verify
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from database import client, collection, rollups_collection, setup_collection  # type: ignore
+
+
+ROLLUP_KEY = ("menu_num", "item", "day")
+BUILT_MARKER = "rollups_built"
+
+# set once the marker has been seen, it never goes away afterwards
+_built = False
+
+
+# ---------- per-row waste (Python and Mongo versions must agree) ----------
+
+def _as_int(field: str) -> dict:
+    # same as int(entry.get(field, 0) or 0) on the Python side
+    return {"$toInt": {"$ifNull": [f"${field}", 0]}}
+
+
+ROW_LEFTOVERS = {"$max": [{"$subtract": [_as_int("qty"), _as_int("taken")]}, 0]}
+ROW_WASTED = _as_int("wasted")
+
+
+def row_waste(doc: dict) -> tuple[int, int]:
+    qty = int(doc.get("qty", 0) or 0)
+    taken = int(doc.get("taken", 0) or 0)
+    wasted = int(doc.get("wasted", 0) or 0)
+    return max(qty - taken, 0), wasted
+
+
+# ---------- keys ----------
+
+def day_of(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def rollup_key(doc: dict):
+    """Rollup key for a listing row, or None if the row isn't rolled up."""
+    created_at = doc.get("created_at")
+    if "menu_num" not in doc or not isinstance(created_at, datetime):
+        return None
+    return doc["menu_num"], doc["item"], day_of(created_at)
+
+
+def split_window(start: datetime, end: datetime):
+    """
+    Split [start, end) into whole days (served from rollups) and the partial
+    days at either edge (served from raw rows).
+    Returns ((first_day, last_day) or None, [(lo, hi), ...]).
+    """
+    first_day = day_of(start)
+    if first_day < start:
+        first_day += timedelta(days=1)
+    last_day = day_of(end)
+
+    if first_day >= last_day:
+        return None, [(start, end)]
+
+    edges = []
+    if start < first_day:
+        edges.append((start, first_day))
+    if last_day < end:
+        edges.append((last_day, end))
+    return (first_day, last_day), edges
+
+
+# ---------- incremental maintenance ----------
+
+def _accumulate(docs: list[dict], sign: int, deltas: dict, first_ids: dict):
+    for doc in docs:
+        key = rollup_key(doc)
+        if key is None:
+            continue
+        leftovers, wasted = row_waste(doc)
+        d = deltas.setdefault(key, {"leftovers": 0, "wasted": 0, "rows": 0})
+        d["leftovers"] += sign * leftovers
+        d["wasted"] += sign * wasted
+        d["rows"] += sign
+        if sign > 0 and "_id" in doc and (key not in first_ids or doc["_id"] < first_ids[key]):
+            first_ids[key] = doc["_id"]
+
+
+async def apply_changes(added: list[dict], removed: list[dict]):
+    """
+    Net rollup update for rows that were inserted (added) and deleted
+    (removed). An in-place edit is its old version removed + new one added.
+    """
+    deltas: dict[tuple, dict] = {}
+    first_ids: dict[tuple, object] = {}
+    _accumulate(added, 1, deltas, first_ids)
+    _accumulate(removed, -1, deltas, first_ids)
+
+    ops = []
+    for key, inc in deltas.items():
+        if not any(inc.values()):
+            continue
+        update: dict = {"$inc": inc}
+        if key in first_ids:
+            update["$min"] = {"first_id": first_ids[key]}
+        ops.append(UpdateOne(dict(zip(ROLLUP_KEY, key)), update, upsert=True))
+
+    if not ops:
+        return
+
+    await rollups_collection.bulk_write(ops, ordered=False)
+
+    if any(inc["rows"] < 0 for inc in deltas.values()):
+        await rollups_collection.delete_many({"rows": {"$lte": 0}})
+
+
+async def add_rows(docs: list[dict], sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) listing rows from the rollups."""
+    if sign > 0:
+        await apply_changes(docs, [])
+    else:
+        await apply_changes([], docs)
+
+
+async def bump(doc: dict, wasted: int = 0):
+    """Apply an in-place $inc on one listing row to its rollup."""
+    key = rollup_key(doc)
+    if key is None:
+        return
+    await rollups_collection.update_one(
+        dict(zip(ROLLUP_KEY, key)),
+        {"$inc": {"wasted": wasted}},
+        upsert=True,
+    )
+
+
+async def drop_menu(menu_num: int):
+    await rollups_collection.delete_many({"menu_num": menu_num})
+
+
+# ---------- reads ----------
+
+async def rollup_item_totals(menu_id, first_day: datetime, last_day: datetime) -> list[dict]:
+    """Per-item {_id, leftovers, wasted, first_id} over whole days [first_day, last_day)."""
+    match: dict = {"day": {"$gte": first_day, "$lt": last_day}}
+    if menu_id is not None:
+        match["menu_num"] = int(menu_id)
+
+    cursor = await rollups_collection.aggregate([
+        {"$match": match},
+        {
+            "$group": {
+                "_id": "$item",
+                "leftovers": {"$sum": "$leftovers"},
+                "wasted": {"$sum": "$wasted"},
+                "first_id": {"$min": "$first_id"},
+            }
+        },
+    ])
+    return await cursor.to_list()
+
+
+# ---------- rebuild / verify ----------
+
+def _raw_rollup_pipeline() -> list[dict]:
+    return [
+        {"$match": {"menu_num": {"$exists": True}, "created_at": {"$type": "date"}}},
+        {
+            "$group": {
+                "_id": {
+                    "menu_num": "$menu_num",
+                    "item": "$item",
+                    "day": {
+                        "$dateFromParts": {
+                            "year": {"$year": "$created_at"},
+                            "month": {"$month": "$created_at"},
+                            "day": {"$dayOfMonth": "$created_at"},
+                        }
+                    },
+                },
+                "leftovers": {"$sum": ROW_LEFTOVERS},
+                "wasted": {"$sum": ROW_WASTED},
+                "rows": {"$sum": 1},
+                "first_id": {"$min": "$_id"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "menu_num": "$_id.menu_num",
+                "item": "$_id.item",
+                "day": "$_id.day",
+                "leftovers": "$leftovers",
+                "wasted": "$wasted",
+                "rows": "$rows",
+                "first_id": "$first_id",
+            }
+        },
+    ]
+
+
+async def rebuild():
+    """Recompute every rollup doc from the raw listing rows."""
+    global _built
+    cursor = await collection.aggregate(
+        _raw_rollup_pipeline() + [{"$out": rollups_collection.name}]
+    )
+    await cursor.to_list()
+    # $out keeps existing indexes, this covers the very first rebuild
+    from indexes import ROLLUP_INDEXES  # type: ignore
+    await rollups_collection.create_indexes(ROLLUP_INDEXES)
+
+    await setup_collection.update_one(
+        {"_id": BUILT_MARKER},
+        {"$set": {"at": datetime.utcnow()}},
+        upsert=True,
+    )
+    _built = True
+
+
+async def is_built() -> bool:
+    """True once the rollups cover all history, i.e. summaries may read them."""
+    global _built
+    if not _built:
+        _built = await setup_collection.find_one({"_id": BUILT_MARKER}) is not None
+    return _built
+
+
+async def ensure_rollups():
+    """Build the rollups from the existing rows if that has never been done."""
+    if not await is_built():
+        await rebuild()
+        print("📦 Built waste rollups from the existing rows")
+
+
+async def verify() -> list[str]:
+    """Compare stored rollups against the raw rows, return the mismatches."""
+    fields = ("leftovers", "wasted", "rows")
+
+    def index(docs):
+        return {
+            tuple(d[k] for k in ROLLUP_KEY): tuple(d.get(f, 0) for f in fields)
+            for d in docs
+        }
+
+    raw = await collection.aggregate(_raw_rollup_pipeline())
+    expected = index(await raw.to_list())
+    stored = index(await rollups_collection.find({}, {"_id": 0}).to_list())
+
+    problems = []
+    for key in sorted(expected.keys() | stored.keys(), key=str):
+        want, got = expected.get(key), stored.get(key)
+        if want != got:
+            problems.append(f"{key}: expected {want}, stored {got}")
+    return problems
+
+
+async def _main(cmd: str) -> int:
+    if cmd not in ("rebuild", "verify"):
+        print(f"Unknown command {cmd!r}, use 'rebuild' or 'verify'")
+        return 2
+
+    try:
+        if cmd == "rebuild":
+            await rebuild()
+            print("✅ Rollups rebuilt")
+
+        problems = await verify()
+        for p in problems:
+            print("❌", p)
+        print(f"{len(problems)} mismatched rollup(s)")
+        return 1 if problems else 0
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "verify")))
@@ -0,0 +1,30 @@
+# singleflight.py
+"""
+Coalesce identical concurrent calls: while a call for a key is in flight,
+later callers with the same key await that call instead of starting another.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0    # callers that joined an in-flight call
+        self.misses = 0  # callers that had to start one
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+
+        # shield: one caller disconnecting must not cancel everyone's result
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "in_flight": len(self._inflight)}
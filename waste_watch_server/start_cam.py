@@ -1,42 +1,114 @@
 from picamera2 import Picamera2
-from ultralytics import YOLO   
 import cv2, requests
-from main import increment_item_waste
+import os, socket, threading
+from collections import Counter
+from datetime import datetime
+
+from cam_pipeline import Pipeline
+from detectors import draw_detections, get_detector
+from motion_gate import CAM_MOTION_GATE, MotionGate
+from tracker import IoUTracker
+
+# where the FastAPI server runs, and which station is sending the events
+API_URL = os.getenv("WASTEWATCH_API", "http://localhost:8000")
+STATION_ID = os.getenv("STATION_ID", socket.gethostname())
+# seconds between event uploads while running, the rest goes out on exit
+UPLOAD_INTERVAL_S = float(os.getenv("CAM_UPLOAD_INTERVAL_S", "5"))
 
 picam2 = Picamera2()
 config = picam2.create_preview_configuration(main={"format": "RGB888", "size": (1000, 750)})
 picam2.configure(config)
 picam2.start()
 
-model = YOLO("/home/adpifive/Documents/wastewatch/best.pt")
+# torch / onnx / openvino, picked by DETECTOR_BACKEND + DETECTOR_MODEL (see detectors.py)
+detector = get_detector()
+print(f"Detector: {detector.backend}")
 acceptance_threshold = 0.3
+# skips the detector while the return slot is empty (see motion_gate.py)
+gate = MotionGate() if CAM_MOTION_GATE else None
+
+# one track per physical item, one waste event per track (see tracker.py)
+tracker = IoUTracker(high_conf=acceptance_threshold)
+counted = Counter()
+# detected but not uploaded yet, shared by the inference and upload threads
+pending_events = []
+events_lock = threading.Lock()
+
+
+def detect(frame):
+    # inference thread
+    if gate is not None and not gate.should_run(frame):
+        # nothing moved, but time still passes for the live tracks
+        tracker.update([])
+        return frame, []
+    detections = detector.detect(frame)
+    for track in tracker.update(detections):
+        class_name = detector.names[track.class_id]
+        counted[class_name] += 1
+        print(f"Detected: {class_name} (track {track.id})")
+        with events_lock:
+            pending_events.append({
+                "item": class_name,
+                "count": 1,
+                "timestamp": datetime.utcnow().isoformat(),
+                "station_id": STATION_ID,
+            })
+    # drawn on the main thread
+    return frame, detections
+
+
+def upload_pending():
+    # one round trip per batch instead of one call per item
+    with events_lock:
+        events = pending_events[:]
+        pending_events.clear()
+    if not events:
+        return
+
+    try:
+        res = requests.post(f"{API_URL}/api/waste-events", json={"events": events}, timeout=10)
+        res.raise_for_status()
+        for outcome in res.json()["outcomes"]:
+            if outcome["status"] == "applied":
+                print(f"Successfully incremented waste for {outcome['item']}")
+            else:
+                print(f"Error incrementing waste for {outcome['item']}: {outcome['status']}")
+    except Exception as e:
+        print(f"Error sending waste events: {e}")
+        # keep them for the next attempt
+        with events_lock:
+            pending_events[:0] = events
+
+
+def upload_loop(stop_event):
+    while not stop_event.wait(UPLOAD_INTERVAL_S):
+        upload_pending()
 
-seen_items = []
-
-while True:
-    frame = picam2.capture_array()
-    results = model(frame)
-    r = results[0]
-    for box in r.boxes:
-        conf = float(box.conf)
-        class_id = int(box.cls)
-        class_name = model.names[class_id]
-        if class_name not in seen_items and conf >= acceptance_threshold:
-            seen_items.append(class_name)
-            print(f"Detected: {class_name}")
-    annotated_frame = results[0].plot()
-    cv2.imshow("YOLO Camera", annotated_frame)
+
+# capture and inference run in their own threads; display stays here since
+# OpenCV windows have to live on the main thread
+pipeline = Pipeline(
+    source=picam2.capture_array,
+    process=detect,
+    report_extra=gate.summary if gate is not None else None,
+)
+pipeline.start()
+uploader = threading.Thread(target=upload_loop, args=(pipeline.stop_event,), daemon=True)
+uploader.start()
+
+while not pipeline.stopped:
+    shown = pipeline.next_display()
+    if shown is not None:
+        annotated_frame = draw_detections(*shown, detector.names)
+        cv2.imshow("YOLO Camera", annotated_frame)
 
     if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
-cv2.destroyAllWindows() 
+pipeline.stop()
+uploader.join()
+cv2.destroyAllWindows()
 picam2.stop()
-print("Seen items during session:", seen_items)
+print(f"Counted during session ({tracker.confirmed} items):", dict(counted))
 
-for item in seen_items:
-    try:
-        increment_item_waste(item)
-        print(f"Successfully incremented waste for {item}")
-    except Exception as e:
-        print(f"Error incrementing waste for {item}: {e}")
\ No newline at end of file
+upload_pending()
@@ -0,0 +1,97 @@
+# summary_cache.py
+"""
+Cache for Gemini summaries.
+
+Keyed by a hash of (model, prompt, waste data), so an unchanged report never
+hits Gemini twice. In-memory LRU with a TTL, optionally backed by a Mongo
+collection so the cache survives restarts and is shared between workers.
+
+.env settings:
+    SUMMARY_CACHE_TTL_S        seconds an entry stays valid (default 6h)
+    SUMMARY_CACHE_MAX_ENTRIES  in-memory LRU size (default 256)
+    SUMMARY_CACHE_BACKEND      "memory" (default) or "mongo"
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from database import summary_cache_collection  # type: ignore
+
+
+SUMMARY_CACHE_TTL_S = int(os.getenv("SUMMARY_CACHE_TTL_S", str(6 * 60 * 60)))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "256"))
+SUMMARY_CACHE_BACKEND = os.getenv("SUMMARY_CACHE_BACKEND", "memory")
+
+
+def cache_key(model: str, prompt: str, payload) -> str:
+    """sha256 over model, prompt template and a canonical dump of the data."""
+    h = hashlib.sha256()
+    for part in (model, prompt, json.dumps(payload, sort_keys=True, default=str)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, ttl_s: int, max_entries: int, store=None):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.store = store  # optional Mongo collection
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, text = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+            del self._entries[key]
+
+        if self.store is not None:
+            doc = await self.store.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+            )
+            if doc is not None:
+                self._remember(key, doc["text"])
+                self.hits += 1
+                return doc["text"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, text: str):
+        self._remember(key, text)
+
+        if self.store is not None:
+            await self.store.replace_one(
+                {"_id": key},
+                {
+                    "text": text,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_s),
+                },
+                upsert=True,
+            )
+
+    def _remember(self, key: str, text: str):
+        self._entries[key] = (time.monotonic() + self.ttl_s, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+summary_cache = SummaryCache(
+    ttl_s=SUMMARY_CACHE_TTL_S,
+    max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+    store=summary_cache_collection if SUMMARY_CACHE_BACKEND == "mongo" else None,
+)
@@ -0,0 +1,92 @@
+# summary_models.py
+"""
+Models that write the markdown waste summary.
+
+    SUMMARY_MODEL=gemini  (default) Gemini via google-genai, needs GEMINI_API_KEY
+    SUMMARY_MODEL=local   offline stand-in, builds the report from the numbers
+                          alone (dev / tests without network)
+
+Every model has the same two calls:
+    await model.generate(prompt, data) -> str
+    async for chunk in model.stream(prompt, data): ...
+"""
+import asyncio
+import os
+from typing import AsyncIterator
+
+
+class GeminiSummaryModel:
+    def __init__(self, api_key: str, model: str):
+        import google.genai as genai
+
+        self.client = genai.Client(api_key=api_key)
+        self.name = model
+
+    async def generate(self, prompt: str, data: dict) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.name,
+            contents=prompt,
+        )
+        return response.text
+
+    async def stream(self, prompt: str, data: dict) -> AsyncIterator[str]:
+        chunks = await self.client.aio.models.generate_content_stream(
+            model=self.name,
+            contents=prompt,
+        )
+        async for chunk in chunks:
+            if chunk.text:
+                yield chunk.text
+
+
+class LocalSummaryModel:
+    """Deterministic, network-free stand-in for Gemini."""
+
+    name = "local"
+
+    def __init__(self, chunk_delay_s: float = 0.0):
+        self.chunk_delay_s = chunk_delay_s
+
+    def _render(self, data: dict) -> str:
+        rows = data.get("individual_waste", [])
+        total = data.get("total_waste", 0)
+        if not rows or not total:
+            return "**No waste recorded** for this selection."
+
+        top = rows[0]
+        share = 100 * top["total_waste"] / total
+        leftovers = sum(r["leftovers"] for r in rows)
+        wasted = sum(r["wasted"] for r in rows)
+        lowest = [r["item"] for r in rows[-3:]]
+
+        return (
+            f"**{top['item']}** is the largest contributor, about "
+            f"**{share:.0f}%** of {total} wasted portions.\n\n"
+            f"Leftovers: {leftovers}, explicitly wasted: {wasted}.\n\n"
+            "Lowest waste, consider featuring more:\n"
+            + "".join(f"- {item}\n" for item in lowest)
+        )
+
+    async def generate(self, prompt: str, data: dict) -> str:
+        return self._render(data)
+
+    async def stream(self, prompt: str, data: dict) -> AsyncIterator[str]:
+        for line in self._render(data).splitlines(keepends=True):
+            if self.chunk_delay_s:
+                await asyncio.sleep(self.chunk_delay_s)
+            yield line
+
+
+def get_summary_model():
+    kind = os.getenv("SUMMARY_MODEL", "gemini")
+
+    if kind == "local":
+        return LocalSummaryModel(float(os.getenv("LOCAL_SUMMARY_CHUNK_DELAY_S", "0")))
+
+    if kind == "gemini":
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY is missing from .env")
+        return GeminiSummaryModel(api_key, os.getenv("GEMINI_MODEL", "gemini-2.5-flash"))
+
+    raise RuntimeError(f"Unknown SUMMARY_MODEL {kind!r}, use 'gemini' or 'local'")
@@ -0,0 +1,194 @@
+# tracker.py
+"""
+Lightweight IoU tracker (ByteTrack-style) so each physical item on the
+return station becomes one waste event, however many frames it is seen in.
+
+Per frame:
+  1. confident detections (>= TRACK_HIGH_CONF) are matched to live tracks by IoU
+  2. weak detections (>= TRACK_LOW_CONF) may only extend tracks left over,
+     which keeps an item alive through a few low-score frames
+  3. unmatched confident detections start new tentative tracks
+A track is confirmed (and counted, once) after TRACK_MIN_HITS matches, and
+forgotten after TRACK_MAX_AGE missed frames or TRACK_MAX_AGE_S seconds.
+Both are short on purpose: the next tray's item lands in the same spot, and
+a track that outlives its item would swallow it. Frames the motion gate
+skips still go in, as frames with no detections, so an idle slot ages
+tracks too.
+Tentative tracks match any class, YOLO often flips between similar foods
+and the votes settle that; the track's class is the one with the highest
+summed confidence. Once confirmed, a track only takes detections of the
+classes it has voted for, a different food in the same spot is a new item.
+
+Memory is bounded: at most TRACK_MAX_TRACKS live tracks (oldest tentative
+ones go first) and nothing is kept for tracks that ended.
+
+.env settings (detections below DETECTOR_CONF never reach the tracker):
+    TRACK_HIGH_CONF   default 0.3, same as start_cam's acceptance threshold
+    TRACK_LOW_CONF    default 0.1
+    TRACK_IOU         min IoU to continue a track (default 0.3)
+    TRACK_MIN_HITS    matches before a track counts (default 3)
+    TRACK_MAX_AGE     missed frames before a track ends (default 5)
+    TRACK_MAX_AGE_S   seconds unseen before a track ends (default 1)
+    TRACK_MAX_TRACKS  live tracks kept (default 64)
+"""
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+
+TRACK_HIGH_CONF = float(os.getenv("TRACK_HIGH_CONF", "0.3"))
+TRACK_LOW_CONF = float(os.getenv("TRACK_LOW_CONF", "0.1"))
+TRACK_IOU = float(os.getenv("TRACK_IOU", "0.3"))
+TRACK_MIN_HITS = int(os.getenv("TRACK_MIN_HITS", "3"))
+TRACK_MAX_AGE = int(os.getenv("TRACK_MAX_AGE", "5"))
+TRACK_MAX_AGE_S = float(os.getenv("TRACK_MAX_AGE_S", "1"))
+TRACK_MAX_TRACKS = int(os.getenv("TRACK_MAX_TRACKS", "64"))
+
+# class votes kept per track, the rest are noise
+MAX_CLASS_VOTES = 4
+
+
+class Track:
+    __slots__ = ("id", "box", "hits", "misses", "last_seen", "confirmed", "votes")
+
+    def __init__(self, track_id: int, box: np.ndarray, class_id: int, conf: float, now: float):
+        self.id = track_id
+        self.box = box
+        self.hits = 1
+        self.misses = 0
+        self.last_seen = now
+        self.confirmed = False
+        # class id -> summed confidence
+        self.votes = {class_id: conf}
+
+    @property
+    def class_id(self) -> int:
+        return max(self.votes, key=self.votes.__getitem__)
+
+    @property
+    def conf(self) -> float:
+        return self.votes[self.class_id] / self.hits
+
+    def update(self, box: np.ndarray, class_id: int, conf: float, now: float):
+        self.box = box
+        self.hits += 1
+        self.misses = 0
+        self.last_seen = now
+        self.votes[class_id] = self.votes.get(class_id, 0.0) + conf
+        if len(self.votes) > MAX_CLASS_VOTES:
+            del self.votes[min(self.votes, key=self.votes.__getitem__)]
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (n, 4) and (m, 4) xyxy boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def greedy_match(ious: np.ndarray, min_iou: float) -> list[tuple[int, int]]:
+    """(row, col) pairs, best IoU first, each row and col used once."""
+    pairs = []
+    if ious.size == 0:
+        return pairs
+    rows, cols = np.nonzero(ious >= min_iou)
+    order = np.argsort(-ious[rows, cols])
+    used_r, used_c = set(), set()
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r not in used_r and c not in used_c:
+            used_r.add(r)
+            used_c.add(c)
+            pairs.append((r, c))
+    return pairs
+
+
+class IoUTracker:
+    def __init__(
+        self,
+        high_conf: float = TRACK_HIGH_CONF,
+        low_conf: float = TRACK_LOW_CONF,
+        min_iou: float = TRACK_IOU,
+        min_hits: int = TRACK_MIN_HITS,
+        max_age: int = TRACK_MAX_AGE,
+        max_age_s: float = TRACK_MAX_AGE_S,
+        max_tracks: int = TRACK_MAX_TRACKS,
+    ):
+        self.high_conf = high_conf
+        self.low_conf = low_conf
+        self.min_iou = min_iou
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.max_age_s = max_age_s
+        self.max_tracks = max_tracks
+        self.tracks: list[Track] = []
+        self._next_id = 1
+        self.confirmed = 0
+
+    def _associate(self, tracks: list[Track], dets: list, now: float) -> tuple[list[Track], list]:
+        """Updates matched tracks; returns (unmatched tracks, unmatched dets)."""
+        if not tracks or not dets:
+            return tracks, dets
+        boxes = np.array([[d.x1, d.y1, d.x2, d.y2] for d in dets], dtype=np.float32)
+        ious = iou_matrix(np.stack([t.box for t in tracks]), boxes)
+        # a confirmed track never takes over a class it hasn't voted for
+        for ti, t in enumerate(tracks):
+            if t.confirmed:
+                for di, d in enumerate(dets):
+                    if d.class_id not in t.votes:
+                        ious[ti, di] = 0.0
+        matched_t, matched_d = set(), set()
+        for ti, di in greedy_match(ious, self.min_iou):
+            d = dets[di]
+            tracks[ti].update(boxes[di], d.class_id, d.conf, now)
+            matched_t.add(ti)
+            matched_d.add(di)
+        return (
+            [t for i, t in enumerate(tracks) if i not in matched_t],
+            [d for i, d in enumerate(dets) if i not in matched_d],
+        )
+
+    def update(self, detections: list, now: Optional[float] = None) -> list[Track]:
+        """
+        Feed one frame's detections (detectors.Detection). Returns the tracks
+        confirmed on this frame, each exactly once in its lifetime.
+        """
+        now = time.monotonic() if now is None else now
+        high = [d for d in detections if d.conf >= self.high_conf]
+        low = [d for d in detections if self.low_conf <= d.conf < self.high_conf]
+
+        left, new_dets = self._associate(self.tracks, high, now)
+        left, _ = self._associate(left, low, now)
+        for t in left:
+            t.misses += 1
+
+        for d in new_dets:
+            box = np.array([d.x1, d.y1, d.x2, d.y2], dtype=np.float32)
+            self.tracks.append(Track(self._next_id, box, d.class_id, d.conf, now))
+            self._next_id += 1
+
+        self.tracks = [
+            t for t in self.tracks
+            if t.misses <= self.max_age and now - t.last_seen <= self.max_age_s
+        ]
+        if len(self.tracks) > self.max_tracks:
+            # tentative first, then the least recently seen
+            self.tracks.sort(key=lambda t: (t.confirmed, t.last_seen), reverse=True)
+            del self.tracks[self.max_tracks:]
+
+        confirmed = []
+        for t in self.tracks:
+            if not t.confirmed and t.hits >= self.min_hits:
+                t.confirmed = True
+                self.confirmed += 1
+                confirmed.append(t)
+        return confirmed
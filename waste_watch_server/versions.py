@@ -0,0 +1,31 @@
+# versions.py
+"""
+Data version counters: one per menu ("menu:<n>") plus a global one ("all").
+Every write path bumps them, so readers can tell whether anything changed
+without re-running a query.
+"""
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from database import versions_collection  # type: ignore
+
+
+GLOBAL_KEY = "all"
+
+
+def version_key(menu_id: Optional[int] = None) -> str:
+    return GLOBAL_KEY if menu_id is None else f"menu:{int(menu_id)}"
+
+
+async def bump(*menu_nums: int):
+    keys = {GLOBAL_KEY} | {version_key(n) for n in menu_nums}
+    await versions_collection.bulk_write(
+        [UpdateOne({"_id": k}, {"$inc": {"v": 1}}, upsert=True) for k in sorted(keys)],
+        ordered=False,
+    )
+
+
+async def current(menu_id: Optional[int] = None) -> int:
+    doc = await versions_collection.find_one({"_id": version_key(menu_id)})
+    return doc["v"] if doc else 0
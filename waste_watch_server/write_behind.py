@@ -0,0 +1,117 @@
+# write_behind.py
+"""
+Optional write-behind buffer for waste increments.
+
+With WASTE_BUFFER_ENABLED=1, PUT /items/{item_name} only adds to an
+in-memory counter per item and returns right away. The buffer is flushed
+as one bulk update every WASTE_BUFFER_MAX_STALENESS_MS, as soon as it
+holds WASTE_BUFFER_MAX_ITEMS distinct items, and on shutdown. Trades a
+little visibility delay for far fewer writes during peak meal periods.
+Counts from a failed flush are kept for the next one; while that leaves
+the buffer full, increments for items not already in it are refused.
+
+.env settings:
+    WASTE_BUFFER_ENABLED            "1" to turn it on (default off)
+    WASTE_BUFFER_MAX_STALENESS_MS   max delay before a write lands (default 250)
+    WASTE_BUFFER_MAX_ITEMS          distinct items held before an early flush (default 500)
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from models import WasteEvent  # type: ignore
+
+
+WASTE_BUFFER_ENABLED = os.getenv("WASTE_BUFFER_ENABLED", "0") == "1"
+WASTE_BUFFER_MAX_STALENESS_MS = int(os.getenv("WASTE_BUFFER_MAX_STALENESS_MS", "250"))
+WASTE_BUFFER_MAX_ITEMS = int(os.getenv("WASTE_BUFFER_MAX_ITEMS", "500"))
+
+
+class WasteBuffer:
+    def __init__(
+        self,
+        flush: Callable[[list[WasteEvent]], Awaitable[list[dict]]],
+        max_staleness_ms: int = WASTE_BUFFER_MAX_STALENESS_MS,
+        max_items: int = WASTE_BUFFER_MAX_ITEMS,
+    ):
+        self._flush_fn = flush
+        self.max_staleness_s = max_staleness_ms / 1000
+        self.max_items = max_items
+        # item -> (count, latest timestamp)
+        self._pending: dict[str, tuple[int, datetime]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.increments = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.rejected = 0
+
+    async def add(self, item: str, count: int = 1) -> bool:
+        """False if the buffer is full and could not be flushed, nothing is kept then."""
+        if item not in self._pending and len(self._pending) >= self.max_items:
+            # full: flush before taking more, keeps memory bounded
+            await self.flush()
+            if len(self._pending) >= self.max_items:
+                # the flush failed and put its counts back
+                self.rejected += count
+                return False
+
+        n, _ = self._pending.get(item, (0, None))
+        self._pending[item] = (n + count, datetime.utcnow())
+        self.increments += count
+        return True
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+
+            events = [
+                WasteEvent(item=item, count=n, timestamp=ts)
+                for item, (n, ts) in pending.items()
+            ]
+            try:
+                outcomes = await self._flush_fn(events)
+            except Exception as e:
+                # put the counts back, they'll go out with the next flush
+                for item, (n, ts) in pending.items():
+                    m, _ = self._pending.get(item, (0, ts))
+                    self._pending[item] = (m + n, ts)
+                print(f"⚠️  Waste buffer flush failed, will retry: {e}")
+                return
+
+            self.flushes += 1
+            self.rows_written += len({o["row_id"] for o in outcomes if o["status"] == "applied"})
+            for o in outcomes:
+                if o["status"] != "applied":
+                    print(f"⚠️  Buffered waste for {o['item']} dropped: {o['status']}")
+
+    async def _run_forever(self):
+        while True:
+            await asyncio.sleep(self.max_staleness_s)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_items": len(self._pending),
+            "increments": self.increments,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rejected": self.rejected,
+        }